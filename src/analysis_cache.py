@@ -0,0 +1,105 @@
+import os
+from collections import OrderedDict
+
+from checks.flags import FLAGS_COLUMN, pack_flags, select_flags
+from checks.pipeline import select_checks
+from checks.progressive import run_in_blocks
+from report_generator import summarize
+
+# Memory the app may spend on evaluated uploads per session
+DEFAULT_BUDGET_MB = float(os.getenv("EVADENCE_APP_CACHE_MB", "512"))
+
+
+class AnalysisCache:
+    """Evaluated uploads kept between Streamlit reruns, keyed by file content hash.
+
+    Each entry holds the uploaded frame with the columns of every check run on
+    it so far, so moving a slider redraws from memory and ticking another check
+    runs only that check. Boolean flags are kept bit-packed and labels as
+    categoricals (see checks.flags). Summaries are memoized per check selection, and
+    rates estimated from a sample per sampled checks and interval settings. Least
+    recently used entries are dropped once the frames exceed the memory budget;
+    the most recent entry is always kept.
+    """
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB):
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self.entries = OrderedDict()
+
+    def _entry(self, file_hash):
+        entry = self.entries.get(file_hash)
+        if entry is not None:
+            self.entries.move_to_end(file_hash)
+        return entry
+
+    def _summary_only_entry(self, file_hash):
+        """An entry without a frame, for results computed without keeping the rows."""
+        entry = self.entries[file_hash] = {"frame": None, "columns": [], "checks": set(), "summaries": {}, "bytes": 0}
+        return entry
+
+    def missing(self, file_hash, names):
+        """Checks in names that have not run on this file yet."""
+        entry = self._entry(file_hash)
+        done = entry["checks"] if entry is not None else set()
+        return [name for name in names if name not in done]
+
+    def evaluate(self, file_hash, load, names, **kwargs):
+        """Runs the checks in names that are not cached yet on the file's frame.
+
+        load() reads the upload and is only called the first time a file is
+        seen. kwargs (e.g. on_block) are passed on to run_in_blocks.
+        """
+        entry = self._entry(file_hash)
+        if entry is None or entry["frame"] is None:
+            # Sampled estimates stored before the frame was kept stay valid
+            frame = load()
+            entry = {"frame": frame, "columns": list(frame.columns), "checks": set(), "summaries": {}, "bytes": 0,
+                     "estimates": (entry or {}).get("estimates", {})}
+        missing = [name for name in names if name not in entry["checks"]]
+        if missing:
+            run_in_blocks(entry["frame"], missing, **kwargs)
+            pack_flags(entry["frame"])
+            entry["checks"].update(missing)
+            entry["summaries"] = {}
+            entry["bytes"] = int(entry["frame"].memory_usage(deep=True).sum())
+        self.entries[file_hash] = entry
+        self._evict()
+
+    def put_summary(self, file_hash, names, summary):
+        """Stores a summary computed elsewhere, e.g. by streaming the file in chunks."""
+        entry = self._entry(file_hash) or self._summary_only_entry(file_hash)
+        entry["summaries"][frozenset(names)] = summary
+
+    def put_estimates(self, file_hash, names, margin, confidence, estimates):
+        """Stores rates estimated from a sample (see checks.sampling) for the sampled checks in names."""
+        entry = self._entry(file_hash) or self._summary_only_entry(file_hash)
+        entry.setdefault("estimates", {})[(frozenset(names), margin, confidence)] = estimates
+
+    def estimates(self, file_hash, names, margin, confidence):
+        """Rates stored by put_estimates for these checks and interval settings, or None."""
+        entry = self._entry(file_hash)
+        if entry is None:
+            return None
+        return entry.get("estimates", {}).get((frozenset(names), margin, confidence))
+
+    def summary(self, file_hash, names):
+        """The report summary of the selected checks, or None if some of them have not run on this file."""
+        entry = self._entry(file_hash)
+        if entry is None:
+            return None
+        key = frozenset(names)
+        if key not in entry["summaries"]:
+            if entry["frame"] is None or not key <= entry["checks"]:
+                return None
+            # Summarize only the selected checks, even if more have run on the cached frame
+            frame = entry["frame"]
+            check_columns = [column for check in select_checks(names) for column in check.columns]
+            selected = frame[entry["columns"] + [column for column in check_columns if column in frame.columns]]
+            if FLAGS_COLUMN in frame.columns:
+                selected = selected.assign(**{FLAGS_COLUMN: select_flags(frame, check_columns)})
+            entry["summaries"][key] = summarize(selected)
+        return entry["summaries"][key]
+
+    def _evict(self):
+        while len(self.entries) > 1 and sum(entry["bytes"] for entry in self.entries.values()) > self.budget_bytes:
+            self.entries.popitem(last=False)
@@ -0,0 +1,105 @@
+import threading
+import time
+
+from checks.inference import InferenceCancelled, use_cancel_event
+from checks.metrics import RunMetrics, use_metrics
+from checks.pipeline import select_checks
+from checks.streaming import issue_mask
+from report_generator import FLAG_COLUMNS, merge_summaries, summarize
+
+# Flagged rows kept for the live preview table
+PREVIEW_ROWS = 50
+
+
+class AnalysisCancelled(Exception):
+    """Raised inside a job once cancel() was called."""
+
+
+class AnalysisJob:
+    """Runs an analysis on a background thread and exposes its progress while it runs.
+
+    target(on_block) does the work and calls on_block(block) with every
+    evaluated block of rows. Streamlit may only be used from the script
+    thread, so the page polls this object on each rerun instead of being
+    updated from here.
+    """
+
+    def __init__(self, target, names, total_rows):
+        self.names = names
+        self.total_rows = max(total_rows, 1)
+        self.rows_done = 0
+        self.summary = None
+        self.preview = []
+        self.error = None
+        self.cancelled = False
+        self.metrics = None
+        self.started = time.perf_counter()
+        self.done = threading.Event()
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, args=(target,), daemon=True, name="analysis")
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self, target):
+        # Metrics and cancellation belong to this job, not to the process other sessions share
+        self.metrics = use_metrics(RunMetrics())
+        use_cancel_event(self._cancel)
+        try:
+            target(self.on_block)
+        except (AnalysisCancelled, InferenceCancelled):
+            self.cancelled = True
+        except Exception as e:
+            self.error = e
+        finally:
+            self.metrics.finish()
+            self.done.set()
+
+    def on_block(self, block, summary=None):
+        """Adds an evaluated block to the running counts and preview; raises once the job is cancelled."""
+        if self._cancel.is_set():
+            raise AnalysisCancelled()
+        block_summary = summarize(block)
+        flagged = block[issue_mask(block)]
+        with self._lock:
+            self.rows_done += len(block)
+            self.summary = merge_summaries(self.summary, block_summary)
+            if len(self.preview) < PREVIEW_ROWS:
+                self.preview.extend(flagged.head(PREVIEW_ROWS - len(self.preview)).to_dict("records"))
+
+    def cancel(self):
+        """Stops the job after the current block; requests not yet sent to the API are dropped."""
+        self._cancel.set()
+
+    def check_progress(self):
+        """Fraction of rows each selected check has finished, from the run metrics."""
+        if self.metrics is None:
+            return {name: 0.0 for name in self.names}
+        timings = self.metrics.to_dict()["checks"]
+        progress = {}
+        for check in select_checks(self.names):
+            rows = sum(entry["rows"] for name, entry in timings.items()
+                       if name == check.name or check.message_task in name.split("+"))
+            progress[check.name] = min(rows / self.total_rows, 1.0)
+        return progress
+
+    def flag_counts(self):
+        """Running count of every flag the selected checks produce."""
+        with self._lock:
+            summary = self.summary or {}
+        columns = {column for check in select_checks(self.names) for column in check.columns}
+        counts = {column: summary[column] for column in FLAG_COLUMNS if column in columns and summary.get(column) is not None}
+        if "relevance_flag" in columns and summary.get("irrelevant") is not None:
+            counts["irrelevant"] = summary["irrelevant"]
+        return counts
+
+    def eta_seconds(self):
+        """Seconds left at the throughput observed so far, or None before the first block."""
+        with self._lock:
+            done = self.rows_done
+        if not done:
+            return None
+        elapsed = time.perf_counter() - self.started
+        return max(self.total_rows - done, 0) * elapsed / done
@@ -1,24 +1,20 @@
+import io
+import json
 import os
-import re
-import time
+import tempfile
+
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
-from cerebras.cloud.sdk import Cerebras, InternalServerError
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
-api_key = os.getenv("CEREBRAS_API_KEY")
-if not api_key:
-    raise ValueError("API Key not found. Please set the CEREBRAS_API_KEY in your .env file.")
-client = Cerebras(api_key=api_key)
-
-# Import specific functions as needed
-from checks.quality_check import check_relevance
-from checks.compliance_check import detect_email, detect_ssn, detect_phone
-from checks.bias_check import detect_language_bias_with_inference, detect_gender_bias_with_inference
-from report_generator import generate_report
+
+# Checks are side-effect free; the Cerebras client is created on the first LLM call
+from analysis_cache import AnalysisCache
+from analysis_job import AnalysisJob
+from checks.journal import fingerprint_source, open_journal
+from checks.pipeline import job_config
+from checks.progressive import DEFAULT_FIRST_BLOCK_ROWS
+from checks.sampling import DEFAULT_CONFIDENCE, DEFAULT_MARGIN, SAMPLED_CHECKS
+from report_generator import PII_FLAG_COLUMNS, derive_metrics, format_estimate, write_report
 
 st.title("Evadence: Ensuring Quality, Compliance, and Ethical Standards for AI Training Data")
 
@@ -29,44 +25,135 @@ uploaded_file = st.file_uploader("Upload your dataset (CSV format)", type="csv")
 relevance_check = st.checkbox("Run Relevance Check")
 pii_detection = st.checkbox("Run PII Detection")
 bias_detection = st.checkbox("Run Bias Detection")
+chunked_mode = st.checkbox("Large file mode (process the upload in chunks)")
+sampling_mode = st.checkbox("Sampling mode (estimate relevance and bias rates from a random sample)")
+sample_margin = st.slider("Target Margin of Error", 0.01, 0.10, DEFAULT_MARGIN, 0.01) if sampling_mode else None
+
+def show_progress(job):
+    """Draws the live state of a running analysis: progress per check, ETA, running counts and flagged rows."""
+    eta = job.eta_seconds()
+    status = f"{job.rows_done} of about {job.total_rows} rows"
+    if eta is not None:
+        status += f" | about {eta:.0f} s left"
+    st.progress(min(job.rows_done / job.total_rows, 1.0), text=status)
+    for name, fraction in job.check_progress().items():
+        st.progress(fraction, text=name)
+    counts = job.flag_counts()
+    if counts:
+        st.write(" | ".join(f"{column}: {count}" for column, count in counts.items()))
+    if job.preview:
+        st.write("Flagged rows so far:")
+        st.dataframe(pd.DataFrame(job.preview))
+
+# Evaluated uploads survive reruns, so sliders and downloads redraw without re-running any check
+if "analysis_cache" not in st.session_state:
+    st.session_state.analysis_cache = AnalysisCache()
+results = st.session_state.analysis_cache
+# Flagged rows hold PII, so they are written to a temporary directory of the session, deleted along with it
+if "workdir" not in st.session_state:
+    st.session_state.workdir = tempfile.TemporaryDirectory(prefix="evadence-")
+workdir = st.session_state.workdir.name
 
 # Run analysis when button is clicked
-if st.button("Run Analysis"):
-    if uploaded_file is not None:
-        df = pd.read_csv(uploaded_file)
-        total_entries = len(df)
-
-        # Initialize checks based on enabled options
-        if relevance_check:
-            df['relevance_flag'] = df['customer_message'].apply(lambda x: check_relevance(x) if pd.notnull(x) else None)
-
-        df['duplicate_flag'] = df.duplicated(subset=['customer_message'], keep=False)
-        df['missing_message'] = df['customer_message'].isnull()
-        df['missing_name'] = df['name'].isnull()
-
-        # Language Quality Check
-        def detect_language_quality(text):
-            poor_quality_pattern = r'[^A-Za-z0-9\s.,!?\'"-]{3,}|^\W+|\W+$|[A-Za-z]{1}\s+[A-Za-z]{1}'
-            return bool(re.search(poor_quality_pattern, str(text)))
-        df['language_quality_flag'] = df['customer_message'].apply(detect_language_quality)
-
-        # PII Detection
-        if pii_detection:
-            for flag, func in {'email_flag': detect_email, 'ssn_flag': detect_ssn, 'phone_flag': detect_phone}.items():
-                df[flag] = df['customer_message'].apply(func) | df['contact_info'].apply(func)
-
-        # Bias Detection
-        if bias_detection:
-            df['language_bias_flag'] = df['customer_message'].apply(
-                lambda msg: detect_language_bias_with_inference(msg) if pd.notnull(msg) else False
-            )
-            df['gender_bias_flag'] = df['name'].apply(
-                lambda name: detect_gender_bias_with_inference(name) if pd.notnull(name) else "unknown"
-            )
+run_clicked = st.button("Run Analysis")
+if uploaded_file is not None:
+    # Initialize checks based on enabled options
+    selected_checks = ["duplicates", "completeness", "language_quality"]
+    if relevance_check:
+        selected_checks.append("relevance")
+    if pii_detection:
+        selected_checks.append("pii_regex")
+    if bias_detection:
+        selected_checks += ["language_bias", "gender_bias"]
+    # The lexicon holds the relevance pre-check's terms and keyword categories such as profanity
+    if relevance_check or bias_detection:
+        selected_checks.append("lexicon")
+    # In sampling mode the LLM checks run on a stratified sample only; every other check still sees every row
+    sampled_checks = [name for name in selected_checks if sampling_mode and name in SAMPLED_CHECKS]
+    selected_checks = [name for name in selected_checks if name not in sampled_checks]
+
+    file_bytes = uploaded_file.getvalue()
+    file_hash = fingerprint_source(file_bytes)
+    # Only the aggregate summary is needed below, so large files can be streamed
+    flagged_path = os.path.join(workdir, f"flagged_rows_{file_hash[:12]}.csv")
+    job_hash, job = st.session_state.get("job", (None, None))
+    # Only checks that have not run on this file yet are evaluated
+    if chunked_mode:
+        pending_checks = selected_checks if results.summary(file_hash, selected_checks) is None else []
+    else:
+        pending_checks = results.missing(file_hash, selected_checks)
+    pending_sample = sampled_checks if sampled_checks and results.estimates(
+        file_hash, sampled_checks, sample_margin, DEFAULT_CONFIDENCE) is None else []
+    if run_clicked and job is None and (pending_checks or pending_sample):
+        # Finished LLM work is journaled, so pressing the button again after a failure resumes the run
+        journal = open_journal(file_hash, job_config(selected_checks))
+        # A new job replaces the flagged rows of earlier files
+        for name in os.listdir(workdir):
+            if os.path.join(workdir, name) != flagged_path:
+                os.remove(os.path.join(workdir, name))
+        source = io.BytesIO(file_bytes)
+
+        def analysis(on_block):
+            try:
+                if pending_checks and chunked_mode:
+                    from checks.streaming import stream_checks
+                    results.put_summary(file_hash, selected_checks, stream_checks(
+                        source, selected_checks, flagged_path=flagged_path, journal=journal, on_chunk=on_block,
+                        first_chunksize=DEFAULT_FIRST_BLOCK_ROWS))
+                elif pending_checks:
+                    results.evaluate(file_hash, lambda: pd.read_csv(source), selected_checks, journal=journal,
+                                     on_block=on_block)
+                if pending_sample:
+                    from checks.sampling import estimate_rates, read_sample_frame
+                    results.put_estimates(file_hash, sampled_checks, sample_margin, DEFAULT_CONFIDENCE, estimate_rates(
+                        read_sample_frame(io.BytesIO(file_bytes)), sampled_checks, margin=sample_margin))
+            except BaseException:
+                # Kept for Run Analysis to resume from
+                journal.close()
+                raise
+            journal.finish()
+
+        # The analysis runs on a background thread so partial results can be shown while it works;
+        # one row per line after the header is close enough for the progress bars and ETA
+        job_hash, job = file_hash, AnalysisJob(analysis, pending_checks + pending_sample, file_bytes.count(b"\n") - 1).start()
+        st.session_state.job = (job_hash, job)
+
+    if job is not None:
+        if not job.done.is_set():
+            if st.button("Cancel Analysis"):
+                job.cancel()
+            progress_area = st.empty()
+            while not job.done.wait(0.5):
+                with progress_area.container():
+                    show_progress(job)
+            progress_area.empty()
+        del st.session_state.job
+        if job.cancelled:
+            st.warning("Analysis cancelled. Finished blocks are journaled, so Run Analysis resumes where it stopped.")
+        elif isinstance(job.error, ValueError):
+            st.error(str(job.error))
+            st.stop()
+        elif job.error is not None:
+            raise job.error
+        else:
+            st.session_state.performance = (job_hash, job.metrics.to_dict())
+
+    summary = results.summary(file_hash, selected_checks)
+    estimates = results.estimates(file_hash, sampled_checks, sample_margin, DEFAULT_CONFIDENCE) if sampled_checks else {}
+    if summary is None or estimates is None:
+        st.info(f"Press Run Analysis to run: {', '.join(pending_checks + pending_sample)}.")
+    else:
+        if estimates:
+            summary = dict(summary, estimates=estimates)
+        derived = derive_metrics(summary)
+        last_hash, performance = st.session_state.get("performance", (None, None))
+        if last_hash != file_hash:
+            performance = None
+        total_entries = summary['total_entries']
 
         # Calculate quality and compliance metrics
-        quality_issues = df['duplicate_flag'].sum() + df['missing_message'].sum() + df['missing_name'].sum()
-        pii_entries = df[['email_flag', 'ssn_flag', 'phone_flag']].sum().sum() if pii_detection else 0
+        quality_issues = summary['duplicate_flag'] + summary['missing_message'] + summary['missing_name']
+        pii_entries = sum(summary[column] for column in PII_FLAG_COLUMNS) if pii_detection else 0
 
         quality_score = (total_entries - quality_issues) / total_entries
         compliance_score = (total_entries - pii_entries) / total_entries
@@ -85,7 +172,10 @@ if st.button("Run Analysis"):
             top_issues.append("Quality (incomplete data, duplicates)")
         if compliance_score < compliance_threshold:
             top_issues.append("Compliance (PII detected)")
-        if bias_detection and (df['language_bias_flag'].sum() > 0 or df['gender_bias_flag'].value_counts().get("unknown", 0) < total_entries):
+        # Counted over every row, or estimated from a sample in sampling mode
+        language_bias_found = bias_detection and bool(derived['language_bias_rate'])
+        gender_found = bias_detection and derived['gender_shares'] is not None and derived['gender_shares'].get("unknown", 0) < 1
+        if language_bias_found or gender_found:
             top_issues.append("Ethics (language or gender bias detected)")
 
         st.write(f"**Overall Assessment:** {overall_assessment}")
@@ -103,18 +193,24 @@ if st.button("Run Analysis"):
             st.info("Next Steps: Ensure personal data is anonymized or removed where unnecessary, and review all PII-related flags.")
 
         # Additional Ethical Warnings with Recommendations
-        if bias_detection:
-            if df['language_bias_flag'].sum() > 0:
-                st.warning("Potential Ethical Concerns: Language bias detected.")
-                st.info("Next Steps: Review flagged entries for biased language, and rephrase terms that imply stereotypes.")
-            if df['gender_bias_flag'].value_counts().get("unknown", 0) < total_entries:
-                st.warning("Gender Representation Imbalance Detected.")
-                st.info("Next Steps: Consider balancing gender representation in your dataset for inclusivity.")
+        if language_bias_found:
+            st.warning("Potential Ethical Concerns: Language bias detected.")
+            st.info("Next Steps: Review flagged entries for biased language, and rephrase terms that imply stereotypes.")
+        if gender_found:
+            st.warning("Gender Representation Imbalance Detected.")
+            st.info("Next Steps: Consider balancing gender representation in your dataset for inclusivity.")
 
         # Summary Visualizations
         st.write("### Quality and Compliance Metrics")
         st.write(f"Quality Score: {quality_score:.2f} | Compliance Score: {compliance_score:.2f}")
 
+        if estimates:
+            st.write("### Estimated Rates (sampled)")
+            st.table(pd.DataFrame(
+                {"Estimate": [format_estimate(entry) for entry in estimates.values()]},
+                index=[name.replace("_", " ").capitalize() for name in estimates],
+            ))
+
         # Bar chart for quality and PII issues
         fig, ax = plt.subplots()
         ax.bar(["Quality Issues", "PII Issues"], [quality_issues, pii_entries])
@@ -137,9 +233,37 @@ if st.button("Run Analysis"):
         with st.expander("Why is Gender Representation Important?"):
             st.write("Balanced gender representation helps avoid perpetuating stereotypes and ensures inclusivity. Read more about [gender bias in AI](https://example.com/gender-bias).")
 
+        # Performance: where the analysis spent its time
+        st.write("### Performance")
+        if performance is None:
+            st.write("Served from the results of an earlier run; no checks ran this time.")
+        else:
+            requests = performance['requests']
+            st.write(f"Total Time: {performance['elapsed_seconds']:.2f} s | Rows/sec: {performance['rows_per_sec']} | "
+                     f"API Requests: {requests['count']} ({requests['errors']} failed) | "
+                     f"Tokens: {performance['tokens']['total']} | Cache Hits: {performance['cache']['hits']}")
+            st.table(pd.DataFrame.from_dict(performance['checks'], orient="index")[["seconds", "rows", "rows_per_sec"]])
+            if requests['count']:
+                st.write(f"Request Latency: p50 {requests['p50_ms']} ms | p99 {requests['p99_ms']} ms | "
+                         f"Rate-limit Wait: {requests['rate_limit_wait_seconds']:.2f} s")
+                fig, ax = plt.subplots()
+                ax.bar([f"≤{bucket['le_ms']}" if bucket['le_ms'] else "more" for bucket in requests['histogram']],
+                       [bucket['count'] for bucket in requests['histogram']])
+                ax.set_xlabel("Latency (ms)")
+                ax.set_ylabel("Requests")
+                st.pyplot(fig)
+            if performance['retries'] or performance['fallbacks']:
+                st.write(f"Retries: {performance['retries']} | Fallbacks: {performance['fallbacks']}")
+            st.download_button(
+                label="Download Performance Metrics",
+                data=json.dumps(performance, indent=2),
+                file_name="Performance_Metrics.json",
+                mime="application/json"
+            )
+
         # Generate report
         output_path = "report.txt"
-        generate_report(df, output_path=output_path)
+        write_report(summary, output_path=output_path, metrics=performance)
         
         st.write("Analysis Complete! Summary Report:")
         with open(output_path, "r") as report_file:
@@ -153,5 +277,21 @@ if st.button("Run Analysis"):
                 file_name="Dataset_Quality_Report.txt",
                 mime="text/plain"
             )
-    else:
-        st.warning("Please upload a CSV file.")
+        st.download_button(
+            label="Download Summary (JSON)",
+            data=json.dumps({'summary': summary, 'derived': derived, 'performance': performance},
+                            indent=2),
+            file_name="Dataset_Quality_Summary.json",
+            mime="application/json"
+        )
+
+        if chunked_mode and os.path.exists(flagged_path):
+            with open(flagged_path, "rb") as file:
+                st.download_button(
+                    label="Download Flagged Rows",
+                    data=file,
+                    file_name="Flagged_Rows.csv",
+                    mime="text/csv"
+                )
+elif run_clicked:
+    st.warning("Please upload a CSV file.")
@@ -0,0 +1,93 @@
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from bench.mock_server import MockCerebrasServer
+from bench.runner import PIPELINE_TARGET, REPORT_TARGET, run_benchmark
+from bench.synthetic import generate_dataset
+from checks.pipeline import select_checks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench",
+                                     description="Benchmark the Evadence checks offline against a mock Cerebras API.")
+    parser.add_argument("--rows", type=int, default=100000, help="Rows for the local (non-LLM) checks and the report")
+    parser.add_argument("--llm-rows", type=int, default=2000, help="Rows for the LLM-backed checks")
+    parser.add_argument("--dataset", help="Benchmark this CSV instead of a synthetic dataset")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic dataset and the mock server")
+    parser.add_argument("--targets",
+                        help=f"Comma-separated checks to benchmark, plus '{REPORT_TARGET}' and '{PIPELINE_TARGET}' "
+                             f"(default: every check and the report)")
+    parser.add_argument("--workers", type=int, default=1, help="Processes for the local checks")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Mean mock API latency")
+    parser.add_argument("--jitter-ms", type=float, default=50, help="Mock latency varies uniformly by this much")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of mock requests failing with a 500")
+    parser.add_argument("--rps", type=float, default=0, help="Mock rate limit in requests per second (0: none)")
+    parser.add_argument("--burst", type=int, help="Mock rate-limit bucket size (default: --rps)")
+    parser.add_argument("--cache", action="store_true", help="Keep the persistent inference cache enabled")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    if args.targets:
+        targets = [target.strip() for target in args.targets.split(",")]
+    else:
+        targets = [check.name for check in select_checks()] + [REPORT_TARGET]
+    llm_checks = {check.name for check in select_checks() if check.uses_llm}
+
+    server = MockCerebrasServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                                requests_per_second=args.rps, burst=args.burst, seed=args.seed).start()
+    if not args.cache:
+        # Inherited by the benchmark processes before they import checks.cache
+        os.environ["INFERENCE_CACHE_PATH"] = ""
+    # Fresh interpreter per benchmark: clean memory peak, empty caches, new executor
+    context = multiprocessing.get_context("spawn")
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = args.dataset
+            if csv_path is None:
+                csv_path = os.path.join(directory, "synthetic.csv")
+                generate_dataset(max(args.rows, args.llm_rows), seed=args.seed).to_csv(csv_path, index=False)
+
+            for target in targets:
+                rows = args.llm_rows if target in llm_checks or target == PIPELINE_TARGET else args.rows
+                server.stats.reset()
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    try:
+                        result = pool.submit(run_benchmark, target, csv_path, rows, server.base_url,
+                                             args.workers, args.cache).result()
+                    except Exception as e:
+                        result = {"target": target, "failed": f"{type(e).__name__}: {e}"}
+                stats = server.stats.snapshot()
+                result.update(api_requests=stats["requests"], api_errors=stats["errors"],
+                              throttled=stats["throttled"],
+                              tokens=stats["prompt_tokens"] + stats["completion_tokens"])
+                results.append(result)
+                print(_format(result), flush=True)
+    finally:
+        server.stop()
+
+    print()
+    print(pd.DataFrame(results).set_index("target").to_string())
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"settings": vars(args), "results": results}, file, indent=2)
+        print(f"Results saved to {args.json}")
+
+
+def _format(result):
+    if "failed" in result:
+        return f"{result['target']:<18} failed: {result['failed']}"
+    latency = f"p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms" if result["calls"] else "no API calls"
+    return (f"{result['target']:<18} {result['rows']:>8} rows {result['seconds']:>8.2f} s "
+            f"{result['rows_per_sec']:>10} rows/s  {result['api_requests']} requests, {latency}, "
+            f"peak {result['peak_rss_mb']} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from checks.batching import BATCH_INSTRUCTIONS, ANSWER_LINE
+from checks.names import lookup_gender
+from checks.pii import COMPILED_PATTERNS
+
+SUPPORT_WORDS = re.compile(r"order|refund|cancel|account|product|deliver|package|warranty|charge|log in|help|support",
+                           re.IGNORECASE)
+BIASED_WORDS = re.compile(r"\b(?:typical woman|girls never|old people|guy was useless)\b", re.IGNORECASE)
+JSON_KEY = re.compile(r'^- "(\w+)"', re.MULTILINE)
+
+
+def answer_for(system_prompt, text):
+    """Plays the model: a plausible, deterministic answer for one input of one of the check prompts."""
+    if "demographic" in system_prompt:
+        return lookup_gender(text) or "unknown"
+    if "compliance officer" in system_prompt:
+        return "contains pii" if any(pattern.search(text) for pattern in COMPILED_PATTERNS.values()) else "no pii"
+    if "bias detection" in system_prompt:
+        return "contains bias" if BIASED_WORDS.search(text) else "no bias"
+    return "relevant" if SUPPORT_WORDS.search(text) else "irrelevant"
+
+
+def completion_content(system_prompt, user_content):
+    """Answers a request in the format the checks expect: plain, numbered batch or combined JSON."""
+    if system_prompt.endswith(BATCH_INSTRUCTIONS):
+        task_prompt = system_prompt[:-len(BATCH_INSTRUCTIONS)]
+        lines = []
+        for line in user_content.splitlines():
+            match = ANSWER_LINE.match(line)
+            if match:
+                lines.append(f"{match.group(1)}: {answer_for(task_prompt, match.group(2))}")
+        return "\n".join(lines)
+    keys = JSON_KEY.findall(system_prompt)
+    if keys:
+        prompts = {"relevance": "", "pii": "compliance officer", "language_bias": "bias detection"}
+        return json.dumps({key: answer_for(prompts.get(key, ""), user_content) for key in keys})
+    return answer_for(system_prompt, user_content)
+
+
+class MockStats:
+    """Request counters of a mock server; reset between benchmarks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.errors = 0
+            self.throttled = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self):
+        with self._lock:
+            return {"requests": self.requests, "errors": self.errors, "throttled": self.throttled,
+                    "prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens}
+
+
+class MockCerebrasServer(ThreadingHTTPServer):
+    """Local stand-in for the Cerebras chat-completions endpoint.
+
+    Every request sleeps for latency_ms (plus up to jitter_ms), fails with a
+    500 at error_rate, and is answered with a 429 and rate-limit headers once
+    the requests_per_second token bucket is empty (0 disables the limit).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=200, jitter_ms=50, error_rate=0.0,
+                 requests_per_second=0, burst=None, seed=0):
+        super().__init__((host, port), MockCerebrasHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.requests_per_second = requests_per_second
+        self.burst = burst or max(1, requests_per_second)
+        self.stats = MockStats()
+        self._random = random.Random(seed)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def admit(self):
+        """Takes a token from the bucket; returns (admitted, seconds until the next token, tokens left)."""
+        with self._lock:
+            if not self.requests_per_second:
+                return True, 0.0, None
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.requests_per_second)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True, 0.0, int(self._tokens)
+            return False, (1 - self._tokens) / self.requests_per_second, 0
+
+    def draw(self):
+        """Returns (delay in seconds, whether this request fails)."""
+        with self._lock:
+            delay = max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            return delay, self._random.random() < self.error_rate
+
+    def start(self):
+        """Serves on a background thread and returns the server."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class MockCerebrasHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        server = self.server
+        server.stats.add(requests=1)
+
+        admitted, retry_after, remaining = server.admit()
+        headers = {}
+        if remaining is not None:
+            headers = {
+                "x-ratelimit-limit-requests": str(server.burst),
+                "x-ratelimit-remaining-requests": str(remaining),
+                "x-ratelimit-reset-requests": f"{retry_after:.3f}",
+            }
+        if not admitted:
+            server.stats.add(throttled=1)
+            headers["retry-after"] = f"{retry_after:.3f}"
+            self._send(429, {"error": {"message": "Rate limit exceeded", "type": "too_many_requests_error"}},
+                       headers)
+            return
+
+        delay, fail = server.draw()
+        time.sleep(delay)
+        if fail:
+            server.stats.add(errors=1)
+            self._send(500, {"error": {"message": "Injected server error", "type": "internal_server_error"}},
+                       headers)
+            return
+
+        request = json.loads(body or b"{}")
+        messages = request.get("messages", [])
+        system_prompt = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        user_content = next((m["content"] for m in messages if m.get("role") == "user"), "")
+        content = completion_content(system_prompt, user_content)
+
+        # Roughly four characters per token, which is close enough for comparing runs
+        prompt_tokens = (len(system_prompt) + len(user_content)) // 4 + 1
+        completion_tokens = len(content) // 4 + 1
+        server.stats.add(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        self._send(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", ""),
+            "system_fingerprint": "mock",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+            "time_info": {"queue_time": 0.0, "prompt_time": 0.0, "completion_time": delay, "total_time": delay,
+                          "created": time.time()},
+        }, headers)
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.mock_server",
+                                     description="Serve a mock Cerebras chat-completions endpoint.")
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--latency-ms", type=float, default=200, help="Mean response latency")
+    parser.add_argument("--jitter-ms", type=float, default=50, help="Latency varies uniformly by this much")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 500")
+    parser.add_argument("--rps", type=float, default=0, help="Requests per second before 429s (0: unlimited)")
+    parser.add_argument("--burst", type=int, help="Rate-limit bucket size (default: --rps)")
+    args = parser.parse_args(argv)
+
+    server = MockCerebrasServer(port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                                error_rate=args.error_rate, requests_per_second=args.rps, burst=args.burst)
+    print(f"Mock Cerebras API on {server.base_url}; point CEREBRAS_BASE_URL there to use it.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Benchmarks that are not a single registered check
+REPORT_TARGET = "report"
+PIPELINE_TARGET = "all"
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far, in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024 if os.uname().sysname == "Linux" else peak / (1024 * 1024)
+
+
+class _TimedCompletions:
+    def __init__(self, completions, latencies):
+        self._completions = completions
+        self._latencies = latencies
+
+    def create(self, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._completions.create(**kwargs)
+        finally:
+            self._latencies.append(time.perf_counter() - start)
+
+
+class _TimedClient:
+    """Wraps a client and records the wall-clock latency of every completion call."""
+
+    def __init__(self, client, latencies):
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = _TimedCompletions(client.chat.completions, latencies)
+
+
+def make_mock_client(base_url, max_connections=64):
+    """Cerebras SDK client pointed at a mock server."""
+    from cerebras.cloud.sdk import Cerebras
+
+    from checks.client import make_http_client
+
+    # No TCP warm-up request, so only check traffic reaches the server's counters; retries are done by checks.inference
+    return Cerebras(api_key="mock", base_url=base_url, warm_tcp_connection=False, max_retries=0,
+                    http_client=make_http_client(max_connections))
+
+
+def run_benchmark(target, csv_path, rows, base_url, workers=1, use_cache=False):
+    """Times one check (or the report, or the whole pipeline) on the first `rows` rows of csv_path.
+
+    Meant to run in a fresh process so memory peaks, caches and the shared
+    inference executor do not leak between benchmarks. Returns a dict of
+    rows, seconds, rows_per_sec, completion calls, p50/p99 call latency and
+    peak memory.
+    """
+    if not use_cache:
+        os.environ["INFERENCE_CACHE_PATH"] = ""
+
+    from checks.client import set_client
+    from checks.inference import DEFAULT_MAX_IN_FLIGHT
+    from checks.pipeline import run_checks, select_checks
+    from report_generator import generate_report
+
+    latencies = []
+    set_client(_TimedClient(make_mock_client(base_url, max_connections=DEFAULT_MAX_IN_FLIGHT), latencies))
+
+    df = pd.read_csv(csv_path, nrows=rows)
+    if target == REPORT_TARGET:
+        local = [check.name for check in select_checks() if not check.uses_llm]
+        df = run_checks(df, local, workers=workers)
+    memory_before = peak_rss_mb()
+
+    start = time.perf_counter()
+    if target == REPORT_TARGET:
+        with tempfile.TemporaryDirectory() as directory:
+            generate_report(df, output_path=os.path.join(directory, "report.txt"))
+    else:
+        run_checks(df, None if target == PIPELINE_TARGET else [target], workers=workers)
+    seconds = time.perf_counter() - start
+
+    memory_after = peak_rss_mb()
+    return {
+        "target": target,
+        "rows": len(df),
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(len(df) / seconds, 1) if seconds else None,
+        "calls": len(latencies),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 1) if latencies else None,
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 1) if latencies else None,
+        "peak_rss_mb": round(memory_after, 1) if memory_after is not None else None,
+        "rss_growth_mb": round(memory_after - memory_before, 1) if memory_after is not None else None,
+    }
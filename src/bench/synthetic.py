@@ -0,0 +1,202 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["customer_message", "name", "contact_info", "customer_intent"]
+
+# Support messages per intent; {n} is an order or ticket number and {product} a product name
+RELEVANT_MESSAGES = {
+    "order inquiry": [
+        "Hey! Can you help me with my order?",
+        "Where is my order #{n}? The {product} was supposed to arrive yesterday.",
+        "My package {n} still shows as processing, any update?",
+        "I ordered the wrong size of the {product}, can I exchange order {n}?",
+    ],
+    "complaint": [
+        "This product sucks!",
+        "The {product} I received is broken and the box was damaged.",
+        "I have been waiting two weeks for a refund on order {n}.",
+        "Your delivery driver left my {product} in the rain.",
+    ],
+    "product inquiry": [
+        "I need info on product X for support",
+        "Does the {product} charger work with the older version?",
+        "Is the {product} waterproof or only water resistant?",
+        "What is the warranty period for the {product}?",
+    ],
+    "cancellation": [
+        "Can I cancel my subscription please?",
+        "Please cancel order {n} before the {product} ships.",
+        "How do I stop the automatic renewal of my {product} plan?",
+    ],
+    "account support": [
+        "I can't log in to my account after the password reset.",
+        "Please update the shipping address on my account before order {n} ships.",
+        "Why was my card charged twice for the {product}?",
+    ],
+}
+
+PRODUCTS = [
+    "blender", "coffee machine", "rain jacket", "hiking boots", "desk lamp", "wireless headphones",
+    "phone case", "office chair", "air fryer", "yoga mat", "backpack", "smart watch", "kettle",
+    "vacuum cleaner", "garden hose", "baby monitor", "electric toothbrush", "standing desk",
+]
+
+# Wrapped around relevant messages so two customers rarely write exactly the same text
+GREETINGS = ["", "", "Hi, ", "Hello, ", "Good morning, ", "Hi team, ", "Dear support, "]
+CLOSINGS = ["", "", " Thanks.", " Thank you!", " Regards.", " Please reply soon.", " Cheers"]
+
+IRRELEVANT_MESSAGES = [
+    "Random unrelated text here",
+    "Another random sentence with no purpose",
+    "Placeholder message for testing",
+    "What a lovely sunny day it is today",
+    "Did anyone watch the {product} episode of that cooking show?",
+    "My cat walked over the keyboard {n} times today",
+    "Test {n} please ignore",
+]
+
+# Stereotyping phrases the language-bias check should catch
+BIASED_MESSAGES = [
+    "Typical woman driver, she dented the car I was delivering for you.",
+    "Your support guy was useless, old people should not answer phones.",
+    "Girls never understand how to assemble this, make the manual simpler.",
+]
+
+# Messages with excessive special characters or stray letters
+POOR_QUALITY_MESSAGES = [
+    "Where is my stuff? I'm f***ing tired of waiting!",
+    "order ### late $$$ again",
+    "h e l p   me",
+    "...",
+]
+
+PII_TEMPLATES = {
+    "email": ("My email is {user}@example.com", "{user}@example.com"),
+    "ssn": ("Here's my SSN: {a:03d}-{b:02d}-{c:04d}", "{a:03d}-{b:02d}-{c:04d}"),
+    "phone": ("My phone number is 555-{c:04d}, please call me", "555-{c:04d}"),
+    "credit_card": ("Charge my card 4111 1111 1111 {c:04d} for order {n}", None),
+    "iban": ("Refund to IBAN DE89 3704 0044 0532 {c:04d} 00 please", None),
+    "ip_address": ("Your site blocks my IP 192.168.{a:d}.{b:d} when I log in", None),
+}
+
+FIRST_NAMES = [
+    "John", "Jane", "Mike", "Sarah", "Tom", "Alice", "David", "Maria", "James", "Emma", "Robert", "Olivia",
+    "Ahmed", "Fatima", "Wei", "Priya", "Carlos", "Sofia", "Kwame", "Yuki", "Alex", "Taylor", "Jordan",
+    # Not in the bundled name index, so the gender check has to ask the model
+    "Zephyrine", "Quillon", "Marwick", "Tavish",
+]
+LAST_NAMES = ["Doe", "Smith", "Garcia", "Chen", "Okafor", "Müller", "Patel", "Kim", "Rossi", "Nguyen"]
+TITLES = ["", "", "", "", "Dr. ", "Mr. ", "Ms. "]
+
+
+def generate_dataset(rows, seed=0, duplicate_rate=0.1, near_duplicate_rate=0.05, pii_rate=0.1,
+                     irrelevant_rate=0.1, bias_rate=0.03, poor_quality_rate=0.05, missing_message_rate=0.02,
+                     missing_name_rate=0.1):
+    """Generates a synthetic support-message dataset shaped like data/flawed_dataset.csv.
+
+    Each rate is the expected fraction of rows of that kind. Exact duplicates
+    repeat an earlier row; near duplicates repeat an earlier message with
+    different case, punctuation or order number. The same seed always yields
+    the same rows.
+    """
+    rng = np.random.default_rng(seed)
+    intents = list(RELEVANT_MESSAGES)
+    pii_kinds = list(PII_TEMPLATES)
+
+    kind = rng.choice(
+        ["relevant", "irrelevant", "pii", "bias", "poor_quality"],
+        size=rows,
+        p=_normalize([1 - irrelevant_rate - pii_rate - bias_rate - poor_quality_rate,
+                      irrelevant_rate, pii_rate, bias_rate, poor_quality_rate]),
+    )
+    numbers = rng.integers(10000, 99999, size=rows)
+    picks = rng.integers(0, 1 << 30, size=(rows, 4))
+
+    messages, names, contacts, row_intents = [], [], [], []
+    for row in range(rows):
+        n, (p0, p1, p2, p3) = numbers[row], picks[row]
+        name = f"{TITLES[p3 % len(TITLES)]}{FIRST_NAMES[p1 % len(FIRST_NAMES)]} {LAST_NAMES[p2 % len(LAST_NAMES)]}"
+        contact = None
+        if kind[row] == "relevant":
+            intent = intents[p0 % len(intents)]
+            templates = RELEVANT_MESSAGES[intent]
+            template = templates[p1 % len(templates)]
+            if "{n}" not in template:
+                template += " (ticket {n})"
+            message = template.format(n=n, product=PRODUCTS[p2 % len(PRODUCTS)])
+            message = f"{GREETINGS[p3 % len(GREETINGS)]}{message}{CLOSINGS[p0 % len(CLOSINGS)]}"
+        elif kind[row] == "irrelevant":
+            intent = "irrelevant"
+            message = IRRELEVANT_MESSAGES[p0 % len(IRRELEVANT_MESSAGES)].format(n=n, product=PRODUCTS[p2 % len(PRODUCTS)])
+        elif kind[row] == "pii":
+            intent = "personal inquiry"
+            template, contact_template = PII_TEMPLATES[pii_kinds[p0 % len(pii_kinds)]]
+            fields = {"user": f"{FIRST_NAMES[p1 % len(FIRST_NAMES)].lower()}{n}", "a": p1 % 256, "b": p2 % 100,
+                      "c": p2 % 10000, "n": n}
+            message = template.format(**fields)
+            contact = contact_template.format(**fields) if contact_template else None
+        elif kind[row] == "bias":
+            intent = "complaint"
+            message = BIASED_MESSAGES[p0 % len(BIASED_MESSAGES)]
+        else:
+            intent = "complaint"
+            message = POOR_QUALITY_MESSAGES[p0 % len(POOR_QUALITY_MESSAGES)]
+        messages.append(message)
+        names.append(name)
+        contacts.append(contact)
+        row_intents.append(intent)
+
+    df = pd.DataFrame({"customer_message": messages, "name": names, "contact_info": contacts,
+                       "customer_intent": row_intents}, columns=COLUMNS)
+
+    # Repeat earlier rows, exactly or with small edits, after the originals exist
+    if rows > 1:
+        copies = rng.random(rows) < duplicate_rate + near_duplicate_rate
+        copies[0] = False
+        targets = np.flatnonzero(copies)
+        sources = (rng.random(len(targets)) * targets).astype(np.int64)
+        near = rng.random(len(targets)) < near_duplicate_rate / max(duplicate_rate + near_duplicate_rate, 1e-9)
+        df.iloc[targets] = df.iloc[sources].to_numpy()
+        near_rows = targets[near]
+        df.loc[near_rows, "customer_message"] = [
+            _perturb(message, rng) for message in df.loc[near_rows, "customer_message"]
+        ]
+
+    df.loc[rng.random(rows) < missing_message_rate, "customer_message"] = None
+    df.loc[rng.random(rows) < missing_name_rate, "name"] = None
+    return df
+
+
+def _normalize(weights):
+    weights = np.clip(np.array(weights, dtype=float), 0, None)
+    return weights / weights.sum()
+
+
+def _perturb(message, rng):
+    """Makes a near duplicate: other case, punctuation and numbers, same words."""
+    if message is None:
+        return message
+    edit = rng.integers(0, 3)
+    if edit == 0:
+        message = message.upper()
+    elif edit == 1:
+        message = message.rstrip("!?.") + " !!"
+    return "".join(str(rng.integers(0, 10)) if char.isdigit() else char for char in message)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.synthetic",
+                                     description="Generate a synthetic customer-support dataset.")
+    parser.add_argument("--rows", type=int, default=10000, help="Number of rows")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", default="../data/synthetic_dataset.csv", help="Where to write the CSV")
+    args = parser.parse_args(argv)
+
+    generate_dataset(args.rows, seed=args.seed).to_csv(args.output, index=False)
+    print(f"Synthetic dataset with {args.rows} rows saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
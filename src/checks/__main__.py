@@ -0,0 +1,118 @@
+import argparse
+import logging
+import os
+
+import pandas as pd
+
+from checks.parallel import DEFAULT_WORKERS
+from checks.journal import fingerprint_source, open_journal
+from checks.metrics import reset_metrics
+from checks.pipeline import job_config, run_checks, select_checks
+from checks.registry import CHECKS
+from checks.sampling import DEFAULT_CONFIDENCE, SAMPLED_CHECKS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m checks", description="Run Evadence dataset checks on a CSV file.")
+    parser.add_argument("input", nargs="?", default="../data/flawed_dataset.csv", help="CSV file to evaluate")
+    parser.add_argument("--checks", help="Comma-separated checks to run (default: all)")
+    parser.add_argument("--output", default="../data/evaluated_dataset.csv", help="Where to write the flagged CSV")
+    parser.add_argument("--report", help="Also write a text report to this path")
+    parser.add_argument("--summary-json",
+                        help="Write the report summary and bias metrics as JSON to this path (default with --report: "
+                             "the report path with a .json suffix)")
+    parser.add_argument("--results",
+                        help="Write the row-level check results to this .parquet, .arrow or .jsonl(.gz) file")
+    parser.add_argument("--chunksize", type=int, help="Stream the file in chunks of this many rows instead of loading it whole")
+    parser.add_argument("--flagged", help="With --chunksize, also write rows with any issue to this path")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes used for the local (non-LLM) checks; 0 uses every core")
+    parser.add_argument("--no-journal", action="store_true",
+                        help="Do not record finished LLM work for resuming an interrupted run")
+    parser.add_argument("--metrics", help="Write per-check timings, request latencies and token usage to this JSON file")
+    parser.add_argument("--sample-margin", type=float,
+                        help="Estimate the relevance, language-bias and gender rates from a stratified sample, to "
+                             "within this confidence-interval half-width (e.g. 0.05), instead of asking the LLM "
+                             "about every row; the other checks still run on every row")
+    parser.add_argument("--confidence", type=float, default=DEFAULT_CONFIDENCE,
+                        help="Confidence level of the sampled intervals (default: %(default)s)")
+    parser.add_argument("--list", action="store_true", help="List the available checks and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for check in CHECKS.values():
+            print(f"{check.name:<18} {'LLM' if check.uses_llm else '   '}  {check.description}")
+        return
+
+    logging.basicConfig(level=logging.INFO)
+    names = [name.strip() for name in args.checks.split(",")] if args.checks else None
+    sampled = []
+    if args.sample_margin:
+        # The LLM checks with a sampled estimate leave the full run
+        selected = [check.name for check in select_checks(names)]
+        sampled = [name for name in selected if name in SAMPLED_CHECKS]
+        names = [name for name in selected if name not in SAMPLED_CHECKS]
+    workers = args.workers or DEFAULT_WORKERS
+    # Rerunning the same file with the same checks picks up where an interrupted run stopped
+    journal = None if args.no_journal else open_journal(fingerprint_source(args.input), job_config(names))
+    metrics = reset_metrics()
+    summary_path = args.summary_json
+    if summary_path is None and args.report:
+        summary_path = os.path.splitext(args.report)[0] + ".json"
+
+    if args.chunksize:
+        from checks.streaming import stream_checks
+        from report_generator import write_report, write_summary_json
+
+        summary = stream_checks(args.input, names, chunksize=args.chunksize, output_path=args.output,
+                                flagged_path=args.flagged, workers=workers, journal=journal,
+                                results_path=args.results)
+        if journal is not None:
+            journal.finish()
+        if sampled:
+            from checks.sampling import estimate_rates, read_sample_frame
+            summary['estimates'] = estimate_rates(read_sample_frame(args.input), sampled, margin=args.sample_margin,
+                                                  confidence=args.confidence)
+        metrics.finish()
+        print(f"Evaluated dataset saved to {args.output}")
+        if args.results:
+            print(f"Row-level results saved to {args.results}")
+        if args.report:
+            write_report(summary, output_path=args.report, metrics=metrics.to_dict())
+        if summary_path:
+            write_summary_json(summary, summary_path, metrics=metrics.to_dict())
+        if args.metrics:
+            metrics.to_json(args.metrics)
+            print(f"Metrics saved to {args.metrics}")
+        return
+
+    df = run_checks(pd.read_csv(args.input), names, workers=workers, journal=journal)
+    if journal is not None:
+        journal.finish()
+    estimates = None
+    if sampled:
+        from checks.sampling import estimate_rates
+        estimates = estimate_rates(df, sampled, margin=args.sample_margin, confidence=args.confidence)
+    metrics.finish()
+    df.to_csv(args.output, index=False)
+    print(f"Evaluated dataset saved to {args.output}")
+
+    if args.results:
+        from report_generator import write_row_results
+        write_row_results(df, args.results)
+    if args.report:
+        from report_generator import generate_report
+        generate_report(df, output_path=args.report, metrics=metrics.to_dict(), summary_path=summary_path,
+                        estimates=estimates)
+    elif summary_path:
+        from report_generator import summarize, write_summary_json
+        summary = summarize(df)
+        if estimates:
+            summary['estimates'] = estimates
+        write_summary_json(summary, summary_path, metrics=metrics.to_dict())
+    if args.metrics:
+        metrics.to_json(args.metrics)
+        print(f"Metrics saved to {args.metrics}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import logging
+import os
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from checks.cache import get_cache, make_key
+from checks.inference import DEFAULT_MODEL, InferenceCancelled, chat, get_executor
+from checks.metrics import get_metrics
+from checks.resilience import CircuitOpen, unavailable_errors
+
+# Number of messages packed into one completion; 1 disables batching
+DEFAULT_BATCH_SIZE = int(os.getenv("INFERENCE_BATCH_SIZE", "1"))
+
+BATCH_INSTRUCTIONS = (
+    "\nYou will receive several numbered inputs. Classify each one independently and reply with exactly "
+    "one line per input in the form '<number>: <answer>', in the same order, with no other text."
+)
+
+ANSWER_LINE = re.compile(r"^\s*\[?(\d+)\]?\s*[:.)\-]\s*(.+?)\s*$")
+
+# A classification task that can run one row at a time or in numbered batches.
+#   parse(answer, text) turns the model's answer for one input into the row label.
+#   single(text) is the existing one-row check, used as the fallback.
+#   precheck(text), if given, is the cheap first tier of the cascade: it returns a
+#   label when local rules already decide the row, or None to ask the LLM.
+BatchTask = namedtuple("BatchTask", ["name", "system_prompt", "parse", "single", "max_completion_tokens", "precheck"],
+                       defaults=(None,))
+
+# Which tier of the cascade decided a row, recorded in the `<check>_decided_by` columns
+TIER_RULE = "rule"
+TIER_LLM = "llm"
+# The API stayed unavailable; the row holds the check's default label
+TIER_UNDETERMINED = "undetermined"
+
+
+def normalize_text(text):
+    """Collapses whitespace and case so trivially different copies are classified once."""
+    return " ".join(str(text).split()).casefold()
+
+
+def normalized_keys(values):
+    """normalize_text applied to each distinct value once and spread back over the rows."""
+    codes, uniques = pd.factorize(values)
+    normalized = np.array([normalize_text(value) for value in uniques], dtype=object)
+    return pd.Series(normalized[codes], index=values.index, dtype=object)
+
+
+def build_batch_prompt(texts):
+    return "\n".join(f"{i}. {' '.join(str(text).split())}" for i, text in enumerate(texts, start=1))
+
+
+def parse_batch_response(content, count):
+    """Maps 1-based item numbers to answers; numbers that are missing or out of range are left out."""
+    answers = {}
+    for line in content.splitlines():
+        match = ANSWER_LINE.match(line)
+        if not match:
+            continue
+        number = int(match.group(1))
+        if 1 <= number <= count and number not in answers:
+            answers[number] = match.group(2)
+    return answers
+
+
+def _batch_key(task, text):
+    params = {"max_completion_tokens": task.max_completion_tokens, "batched": True}
+    return make_key(DEFAULT_MODEL, task.system_prompt, params, text)
+
+
+def single_label(task, text, default=None):
+    """Runs task.single(text) and returns (label, tier).
+
+    When the API stays unavailable after its retries, or the circuit breaker
+    is open, the row gets (default, TIER_UNDETERMINED) instead of failing the run.
+    """
+    try:
+        return task.single(text), TIER_LLM
+    except InferenceCancelled:
+        raise
+    except unavailable_errors() as e:
+        if not isinstance(e, CircuitOpen):
+            logging.error(f"Failed to process {task.name} input, left undetermined ({e}): {text}")
+        get_metrics().record_undetermined(task.name)
+        return default, TIER_UNDETERMINED
+
+
+def classify_batch(task, texts, client=None, default=None, with_tiers=False):
+    """Classifies texts with a single completion, falling back to task.single for unparseable items.
+
+    Items left undetermined get default (see single_label); with_tiers=True
+    returns a (labels, tiers) pair.
+    """
+    cache = get_cache()
+    answers = {}
+    try:
+        content = chat(
+            task.system_prompt + BATCH_INSTRUCTIONS,
+            build_batch_prompt(texts),
+            max_completion_tokens=task.max_completion_tokens * len(texts) + 16,
+            use_cache=False,
+            client=client,
+        )
+        answers = parse_batch_response(content, len(texts))
+    except InferenceCancelled:
+        raise
+    except CircuitOpen:
+        # The single-row calls below fail fast as well and leave the rows undetermined
+        pass
+    except Exception as e:
+        logging.warning(f"Batch of {len(texts)} {task.name} inputs failed ({e}). Falling back to single-row calls.")
+        get_metrics().record_fallback(f"{task.name} batch")
+
+    labels = []
+    tiers = []
+    for number, text in enumerate(texts, start=1):
+        if number in answers:
+            if cache is not None:
+                cache.put(_batch_key(task, text), answers[number])
+            label, tier = task.parse(answers[number], text), TIER_LLM
+        else:
+            label, tier = single_label(task, text, default)
+        labels.append(label)
+        tiers.append(tier)
+    missing = len(texts) - len(answers)
+    if answers and missing:
+        logging.warning(f"{missing} of {len(texts)} {task.name} answers missing from batch response; re-asked one by one.")
+        get_metrics().record_fallback(f"{task.name} batch")
+    return (labels, tiers) if with_tiers else labels
+
+
+def expand_labels(series, keys, labels, default):
+    """Spreads labels keyed by normalized text back onto every row of series."""
+    mask = series.notnull()
+    out = pd.Series([default] * len(series), index=series.index, dtype=object)
+    out[mask] = [labels[key] for key in keys]
+    return out.infer_objects()
+
+
+def classify_column(series, task, default=None, batch_size=DEFAULT_BATCH_SIZE, client=None, with_tiers=False):
+    """Labels every non-null value in series, classifying each unique normalized text only once.
+
+    Texts that task.precheck decides locally never reach the API. With
+    batch_size > 1 the remaining texts are packed batch_size at a time into one
+    completion. Returns a Series aligned with series.index, or with
+    with_tiers=True a (labels, tiers) pair where tiers records TIER_RULE,
+    TIER_LLM or TIER_UNDETERMINED.
+    """
+    mask = series.notnull()
+    values = series[mask]
+    keys = normalized_keys(values)
+
+    # Keep the first original text seen for each normalized key
+    unique = {}
+    for key, text in zip(keys, values):
+        unique.setdefault(key, text)
+
+    labels = {}
+    tiers = {}
+    if task.precheck is not None:
+        for key, text in unique.items():
+            label = task.precheck(text)
+            if label is not None:
+                labels[key] = label
+                tiers[key] = TIER_RULE
+    unique_keys = [key for key in unique if key not in labels]
+    unique_texts = [unique[key] for key in unique_keys]
+    if labels:
+        get_metrics().record_saved_requests(task.name, len(labels))
+    tiers.update((key, TIER_LLM) for key in unique_keys)
+
+    if batch_size <= 1:
+        results = get_executor().map(lambda text: single_label(task, text, default), unique_texts)
+        for key, (label, tier) in zip(unique_keys, results):
+            labels[key] = label
+            tiers[key] = tier
+    else:
+        cache = get_cache()
+        pending = []
+        for key, text in zip(unique_keys, unique_texts):
+            cached = cache.get(_batch_key(task, text)) if cache is not None else None
+            if cache is not None:
+                get_metrics().record_cache(cached is not None)
+            if cached is not None:
+                labels[key] = task.parse(cached, text)
+            else:
+                pending.append((key, text))
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        results = get_executor().map(
+            lambda batch: classify_batch(task, [text for _, text in batch], client=client, default=default,
+                                         with_tiers=True),
+            batches,
+        )
+        for batch, (batch_labels, batch_tiers) in zip(batches, results):
+            for (key, _), label, tier in zip(batch, batch_labels, batch_tiers):
+                labels[key] = label
+                tiers[key] = tier
+
+    out = expand_labels(series, keys, labels, default)
+    if with_tiers:
+        return out, expand_labels(series, keys, tiers, None)
+    return out
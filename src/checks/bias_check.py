@@ -1,105 +1,89 @@
-import os
-import time
+import numpy as np
 import pandas as pd
-from cerebras.cloud.sdk import Cerebras, InternalServerError
-from dotenv import load_dotenv
-from functools import lru_cache
+from checks.inference import chat
+from checks.batching import BatchTask, classify_column
+from checks.registry import register
+from checks.names import extract_first_name, lookup_gender
 import logging
 
-# Initialize logging
-logging.basicConfig(level=logging.INFO)
+# 1. Language Bias Detection with Cerebras Inference
+LANGUAGE_BIAS_PROMPT = (
+    "You are a bias detection assistant. Analyze the following message for biased or stereotypical language, "
+    "such as terms that might reflect gender, racial, or personality-based stereotypes. "
+    "If you detect any biased language, respond with 'contains bias', otherwise respond with 'no bias'."
+)
 
-# Load environment variables from .env file
-load_dotenv()
-api_key = os.getenv("CEREBRAS_API_KEY")
-if not api_key:
-    raise ValueError("API Key not found. Please set the CEREBRAS_API_KEY in your .env file.")
+def parse_language_bias(content, text):
+    return "contains bias" in content.strip().lower()
 
-client = Cerebras(api_key=api_key)
+def detect_language_bias_with_inference(text):
+    # Transient API errors are retried by checks.inference; checks.batching leaves rows it still fails on undetermined
+    return parse_language_bias(chat(LANGUAGE_BIAS_PROMPT, text), text)
 
-# Load the flawed dataset
-df = pd.read_csv("../data/flawed_dataset.csv")
+LANGUAGE_BIAS_TASK = BatchTask("language bias", LANGUAGE_BIAS_PROMPT, parse_language_bias, detect_language_bias_with_inference, 20)
 
-# 1. Language Bias Detection with Cerebras Inference
-@lru_cache(maxsize=1000)
-def detect_language_bias_with_inference(text):
-    retries = 3
-    for attempt in range(retries):
-        try:
-            response = client.chat.completions.create(
-                messages=[{
-                    "role": "system",
-                    "content": (
-                        "You are a bias detection assistant. Analyze the following message for biased or stereotypical language, "
-                        "such as terms that might reflect gender, racial, or personality-based stereotypes. "
-                        "If you detect any biased language, respond with 'contains bias', otherwise respond with 'no bias'."
-                    )
-                }, {"role": "user", "content": text}],
-                model="llama3.1-8b",
-                max_completion_tokens=20,
-                temperature=0.2
-            )
-            content = response.choices[0].message.content.strip().lower()
-            return "contains bias" in content
-        except InternalServerError:
-            if attempt < retries - 1:
-                logging.warning(f"Attempt {attempt + 1} failed. Retrying...")
-                time.sleep(2)
-            else:
-                logging.error(f"Failed to process message after {retries} attempts: {text}")
-                return False
-
-df['language_bias_flag'] = df['customer_message'].apply(
-    lambda msg: detect_language_bias_with_inference(msg) if pd.notnull(msg) else False
-)
-print("Language bias detected in entries:")
-print(df[df['language_bias_flag']])
+@register("language_bias", ["language_bias_flag", "language_bias_decided_by"], uses_llm=True,
+          message_task="language_bias", description="Biased or stereotypical language")
+def language_bias_flags(df):
+    flags, tiers = classify_column(df['customer_message'], LANGUAGE_BIAS_TASK, default=False, with_tiers=True)
+    return pd.DataFrame({'language_bias_flag': flags, 'language_bias_decided_by': tiers})
 
 # 2. Demographic Bias Detection (Gender Representation) with Cerebras Inference
-@lru_cache(maxsize=1000)
-def detect_gender_bias_with_inference(name):
-    retries = 3
-    for attempt in range(retries):
-        try:
-            response = client.chat.completions.create(
-                messages=[{
-                    "role": "system",
-                    "content": (
-                        "You are a demographic analysis assistant. Analyze the following name and determine if it has a gender association. "
-                        "If the name is commonly associated with a male gender, respond with 'male'; if with a female gender, respond with 'female'. "
-                        "If the name is gender-neutral or unrecognized, respond with 'unknown'."
-                    )
-                }, {"role": "user", "content": name}],
-                model="llama3.1-8b",
-                max_completion_tokens=20,
-                temperature=0.2
-            )
-            content = response.choices[0].message.content.strip().lower()
-            if "male" in content:
-                return "male"
-            elif "female" in content:
-                return "female"
-            else:
-                return "unknown"
-        except InternalServerError:
-            if attempt < retries - 1:
-                logging.warning(f"Attempt {attempt + 1} failed. Retrying...")
-                time.sleep(2)
-            else:
-                logging.error(f"Failed to process name after {retries} attempts: {name}")
-                return "unknown"
-
-df['gender_bias_flag'] = df['name'].apply(
-    lambda name: detect_gender_bias_with_inference(name) if pd.notnull(name) else "unknown"
+GENDER_PROMPT = (
+    "You are a demographic analysis assistant. Analyze the following name and determine if it has a gender association. "
+    "If the name is commonly associated with a male gender, respond with 'male'; if with a female gender, respond with 'female'. "
+    "If the name is gender-neutral or unrecognized, respond with 'unknown'."
 )
-print("\nGender representation in dataset:")
-print(df['gender_bias_flag'].value_counts())
 
-# Generate Bias Summary
-language_bias_count = df['language_bias_flag'].sum()
-gender_bias_summary = df['gender_bias_flag'].value_counts()
+def parse_gender(content, name):
+    content = content.strip().lower()
+    # "female" contains "male", so it has to be tested first
+    if "female" in content:
+        return "female"
+    elif "male" in content:
+        return "male"
+    else:
+        return "unknown"
+
+def detect_gender_bias_with_inference(name):
+    return parse_gender(chat(GENDER_PROMPT, name), name)
+
+# Names found in the bundled first-name index are decided locally; only the rest reach the LLM
+GENDER_TASK = BatchTask("gender", GENDER_PROMPT, parse_gender, detect_gender_bias_with_inference, 20, precheck=lookup_gender)
+
+@register("gender_bias", ["gender_bias_flag", "gender_bias_decided_by"], uses_llm=True,
+          description="Gender association of names")
+def gender_bias_flags(df):
+    # Classify first names, so 'Alice Smith' and 'Alice Jones' share one lookup or LLM call
+    # Extract once per distinct name; the trailing None is what missing names (code -1) pick up
+    codes, uniques = pd.factorize(df['name'])
+    first_names = np.array([extract_first_name(name) or name for name in uniques] + [None], dtype=object)
+    names = pd.Series(first_names[codes], index=df.index, dtype=object)
+    flags, tiers = classify_column(names, GENDER_TASK, default="unknown", with_tiers=True)
+    return pd.DataFrame({'gender_bias_flag': flags, 'gender_bias_decided_by': tiers})
+
+
+if __name__ == "__main__":
+    from checks.pipeline import run_checks
+
+    # Initialize logging
+    logging.basicConfig(level=logging.INFO)
+
+    # Load the flawed dataset
+    df = pd.read_csv("../data/flawed_dataset.csv")
+    df = run_checks(df, ["language_bias", "gender_bias"])
+
+    print("Language bias detected in entries:")
+    print(df[df['language_bias_flag']])
+
+    print("\nGender representation in dataset:")
+    print(df['gender_bias_flag'].value_counts())
+
+    # Generate Bias Summary
+    language_bias_count = df['language_bias_flag'].sum()
+    gender_bias_summary = df['gender_bias_flag'].value_counts()
 
-print("\nBias Summary:")
-print(f"Language Bias Count: {language_bias_count}")
-print("Gender Bias Representation:")
-print(gender_bias_summary)
+    print("\nBias Summary:")
+    print(f"Language Bias Count: {language_bias_count}")
+    print("Gender Bias Representation:")
+    print(gender_bias_summary)
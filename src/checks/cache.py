@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "INFERENCE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "inference_cache.sqlite"),
+)
+DEFAULT_MAX_ENTRIES = int(os.getenv("INFERENCE_CACHE_MAX_ENTRIES", "1000000"))
+DEFAULT_MAX_AGE_DAYS = float(os.getenv("INFERENCE_CACHE_MAX_AGE_DAYS", "30"))
+
+# How many writes happen between eviction sweeps
+EVICT_EVERY = 500
+
+
+def make_key(model, system_prompt, params, text):
+    """Builds a cache key from everything that can change a completion."""
+    payload = json.dumps({
+        "model": model,
+        "system": system_prompt,
+        "params": params,
+        "text": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class InferenceCache:
+    """Persistent completion cache stored in SQLite.
+
+    Safe to share between threads (one connection per thread) and between
+    processes (WAL journal with a busy timeout). Entries expire after
+    max_age_days and the least recently used ones are evicted past max_entries.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            "key TEXT PRIMARY KEY, model TEXT, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS completions_accessed ON completions (accessed)")
+        conn.commit()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """Returns the cached value for key, or None on a miss or expired entry."""
+        conn = self._connection()
+        row = conn.execute("SELECT value, created FROM completions WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or now - row[1] > self.max_age:
+            with self._lock:
+                self.misses += 1
+            return None
+        conn.execute("UPDATE completions SET accessed = ? WHERE key = ?", (now, key))
+        conn.commit()
+        with self._lock:
+            self.hits += 1
+        return row[0]
+
+    def put(self, key, value, model=None):
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO completions (key, model, value, created, accessed) VALUES (?, ?, ?, ?, ?)",
+            (key, model, value, now, now),
+        )
+        conn.commit()
+        with self._lock:
+            self._writes += 1
+            sweep = self._writes % EVICT_EVERY == 0
+        if sweep:
+            self.evict()
+
+    def evict(self):
+        """Drops expired entries, then the least recently used ones beyond max_entries."""
+        conn = self._connection()
+        conn.execute("DELETE FROM completions WHERE created < ?", (time.time() - self.max_age,))
+        count = conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM completions WHERE key IN "
+                "(SELECT key FROM completions ORDER BY accessed ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+        conn.commit()
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute("DELETE FROM completions")
+        conn.commit()
+
+    def stats(self):
+        count = self._connection().execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+        with self._lock:
+            return {"entries": count, "hits": self.hits, "misses": self.misses}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Returns the shared inference cache, or None when INFERENCE_CACHE_PATH is set to an empty string."""
+    global _cache
+    if not DEFAULT_CACHE_PATH:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = InferenceCache()
+        return _cache
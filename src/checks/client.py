@@ -0,0 +1,49 @@
+import os
+import threading
+
+from dotenv import load_dotenv
+
+# One keep-alive connection pool shared by every request; hedged requests can double the in-flight count
+DEFAULT_MAX_CONNECTIONS = int(os.getenv("CEREBRAS_MAX_CONNECTIONS",
+                                        str(2 * int(os.getenv("CEREBRAS_MAX_IN_FLIGHT", "8")))))
+DEFAULT_TIMEOUT_SECONDS = float(os.getenv("CEREBRAS_TIMEOUT_SECONDS", "60"))
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Returns the process-wide Cerebras client, creating it on first use.
+
+    Nothing touches the API key or the SDK until an LLM-backed check actually runs,
+    so importing the checks is free of side effects. The SDK's own retries are
+    off: checks.inference retries with backoff and a circuit breaker instead.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            from cerebras.cloud.sdk import Cerebras
+
+            # Load environment variables from .env file
+            load_dotenv()
+            api_key = os.getenv("CEREBRAS_API_KEY")
+            if not api_key:
+                raise ValueError("API Key not found. Please set the CEREBRAS_API_KEY in your .env file.")
+            _client = Cerebras(api_key=api_key, max_retries=0, timeout=DEFAULT_TIMEOUT_SECONDS,
+                               http_client=make_http_client())
+        return _client
+
+
+def make_http_client(max_connections=DEFAULT_MAX_CONNECTIONS, timeout=DEFAULT_TIMEOUT_SECONDS):
+    """The pooled HTTP client behind the Cerebras client, sized to the inference concurrency."""
+    import httpx
+
+    return httpx.Client(timeout=timeout,
+                        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections))
+
+
+def set_client(client):
+    """Overrides the shared client, e.g. with one pointing at a different base URL."""
+    global _client
+    with _client_lock:
+        _client = client
@@ -1,75 +1,57 @@
-import os
-import re
-import time
+import numpy as np
 import pandas as pd
-from cerebras.cloud.sdk import Cerebras, InternalServerError
-from dotenv import load_dotenv
-from functools import lru_cache
+from checks.flags import flag_values
+from checks.inference import chat
+from checks.lexicon import get_lexicon
+from checks.batching import TIER_RULE, BatchTask, classify_column
+from checks.registry import register
+from checks.pii import COMPILED_PATTERNS, PII_PATTERNS, flag_column, scan_pii
 import logging
 
-# Initialize logging
-logging.basicConfig(level=logging.INFO)
-
-# Load environment variables from .env file
-load_dotenv()
-api_key = os.getenv("CEREBRAS_API_KEY")
-if not api_key:
-    raise ValueError("API Key not found. Please set the CEREBRAS_API_KEY in your .env file.")
-
-client = Cerebras(api_key=api_key)
-
-# Load the dataset
-df = pd.read_csv("../data/flawed_dataset.csv")
-
-# Compliance checks using regex for different types of PII
+# Compliance checks using regex for different types of PII (patterns are compiled once in checks.pii)
 def detect_email(text):
-    email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-    return bool(re.search(email_pattern, str(text)))
+    return bool(COMPILED_PATTERNS["email"].search(str(text)))
 
 def detect_ssn(text):
-    ssn_pattern = r'\b\d{3}-\d{2}-\d{4}\b'
-    return bool(re.search(ssn_pattern, str(text)))
+    return bool(COMPILED_PATTERNS["ssn"].search(str(text)))
 
 def detect_phone(text):
-    phone_pattern = r'\b\d{3}-\d{4}\b|\b\d{3}-\d{3}-\d{4}\b'
-    return bool(re.search(phone_pattern, str(text)))
+    return bool(COMPILED_PATTERNS["phone"].search(str(text)))
+
+@register("pii_regex", [flag_column(kind) for kind in PII_PATTERNS],
+          description="Email, SSN, phone, credit card, IBAN and IP address patterns")
+def pii_regex_flags(df):
+    return scan_pii(df)
+
+@register("lexicon", ["lexicon_categories"],
+          description="Lexicon categories (sensitive, irrelevant, or those of LEXICON_PATH) found in the message")
+def lexicon_flags(df):
+    return pd.DataFrame({'lexicon_categories': get_lexicon().match_column(df['customer_message'])})
 
 # Inference-based PII detection
-@lru_cache(maxsize=1000)  # Caching to avoid redundant API calls for similar text
+PII_PROMPT = (
+    "You are a compliance officer. Analyze the following message to determine if it contains personally identifiable information (PII), "
+    "such as an email address, Social Security number (SSN), or phone number. Respond with 'contains pii' if any PII is found, otherwise respond with 'no pii'."
+)
+
+def parse_pii(content, text):
+    return "contains pii" in content.strip().lower()
+
 def check_pii_with_inference(text):
-    retries = 3
-    for attempt in range(retries):
-        try:
-            response = client.chat.completions.create(
-                messages=[{
-                    "role": "system",
-                    "content": (
-                        "You are a compliance officer. Analyze the following message to determine if it contains personally identifiable information (PII), "
-                        "such as an email address, Social Security number (SSN), or phone number. Respond with 'contains pii' if any PII is found, otherwise respond with 'no pii'."
-                    )
-                }, {"role": "user", "content": text}],
-                model="llama3.1-8b",
-                max_completion_tokens=20,
-                temperature=0.2
-            )
-            content = response.choices[0].message.content.strip().lower()
-            return "contains pii" in content
-        except InternalServerError:
-            if attempt < retries - 1:
-                logging.warning(f"Attempt {attempt + 1} failed. Retrying...")
-                time.sleep(5)
-            else:
-                logging.error(f"Failed to process message after {retries} attempts: {text}")
-                return False
-
-# Apply compliance checks
-df['email_flag'] = df['customer_message'].apply(detect_email) | df['contact_info'].apply(detect_email)
-df['ssn_flag'] = df['customer_message'].apply(detect_ssn) | df['contact_info'].apply(detect_ssn)
-df['phone_flag'] = df['customer_message'].apply(detect_phone) | df['contact_info'].apply(detect_phone)
-df['pii_flag_inference'] = df['customer_message'].apply(lambda msg: check_pii_with_inference(msg) if pd.notnull(msg) else False)
-
-# Combine flags
-df['pii_flag'] = df['email_flag'] | df['ssn_flag'] | df['phone_flag'] | df['pii_flag_inference']
+    # Transient API errors are retried by checks.inference; checks.batching leaves rows it still fails on undetermined
+    return parse_pii(chat(PII_PROMPT, text), text)
+
+def pii_regex_rule(text):
+    """Cheap first tier: a message the email, SSN or phone patterns already match needs no LLM call."""
+    return True if detect_email(text) or detect_ssn(text) or detect_phone(text) else None
+
+PII_TASK = BatchTask("pii", PII_PROMPT, parse_pii, check_pii_with_inference, 20, precheck=pii_regex_rule)
+
+@register("pii_inference", ["pii_flag_inference", "pii_inference_decided_by"], uses_llm=True, message_task="pii",
+          description="PII judged by the LLM")
+def pii_inference_flags(df):
+    flags, tiers = classify_column(df['customer_message'], PII_TASK, default=False, with_tiers=True)
+    return pd.DataFrame({'pii_flag_inference': flags, 'pii_inference_decided_by': tiers})
 
 # Optional: Detailed PII flag
 def get_pii_details(row):
@@ -77,10 +59,43 @@ def get_pii_details(row):
     if row['email_flag']: details.append("email")
     if row['ssn_flag']: details.append("ssn")
     if row['phone_flag']: details.append("phone")
-    if row['pii_flag_inference']: details.append("inferred pii")
+    # Hits of the regex tier are the email, SSN and phone matches above, not inferred
+    if row['pii_flag_inference'] and row.get('pii_inference_decided_by') != TIER_RULE: details.append("inferred pii")
     return ", ".join(details) if details else "no pii"
 
-df['pii_flag_details'] = df.apply(get_pii_details, axis=1)
+# Flags listed in pii_flag_details, with their labels in get_pii_details order
+PII_DETAILS = [("email_flag", "email"), ("ssn_flag", "ssn"), ("phone_flag", "phone"),
+               ("pii_flag_inference", "inferred pii")]
+PII_DETAIL_CATEGORIES = [
+    ", ".join(label for bit, (_, label) in enumerate(PII_DETAILS) if code >> bit & 1) or "no pii"
+    for code in range(1 << len(PII_DETAILS))
+]
+
+def add_pii_summary(df):
+    """Combines the regex and inference flags into pii_flag and pii_flag_details.
+
+    The details are the get_pii_details label of every row, computed from the
+    flag combination as a categorical instead of one string per row. Works on
+    packed frames too (see checks.flags).
+    """
+    flags = np.column_stack([flag_values(df, column).to_numpy(dtype=bool) for column, _ in PII_DETAILS])
+    df['pii_flag'] = flags.any(axis=1)
+    if 'pii_inference_decided_by' in df.columns:
+        flags[:, -1] &= (df['pii_inference_decided_by'] != TIER_RULE).to_numpy(dtype=bool)
+    codes = flags.astype(np.int8) @ (1 << np.arange(len(PII_DETAILS), dtype=np.int8))
+    df['pii_flag_details'] = pd.Categorical.from_codes(codes, categories=PII_DETAIL_CATEGORIES)
+    return df
+
+
+if __name__ == "__main__":
+    from checks.pipeline import run_checks
+
+    # Initialize logging
+    logging.basicConfig(level=logging.INFO)
+
+    # Load the dataset
+    df = pd.read_csv("../data/flawed_dataset.csv")
+    df = add_pii_summary(run_checks(df, ["pii_regex", "pii_inference"]))
 
-# Display the results
-print(df[['customer_message', 'contact_info', 'email_flag', 'ssn_flag', 'phone_flag', 'pii_flag_inference', 'pii_flag', 'pii_flag_details']])
+    # Display the results
+    print(df[['customer_message', 'contact_info', 'email_flag', 'ssn_flag', 'phone_flag', 'pii_flag_inference', 'pii_flag', 'pii_flag_details']])
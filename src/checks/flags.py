@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+
+# Column holding the packed boolean check columns of an evaluated frame
+FLAGS_COLUMN = "flags"
+
+# Boolean check columns packed into FLAGS_COLUMN, in bit order. Bit i is set on
+# rows where the column is True and bit PRESENT_SHIFT + i on every row it was
+# computed for. The order is the storage format: only ever append, and widen
+# FLAGS_DTYPE before a sixteenth column is added.
+PACKED_COLUMNS = [
+    'email_flag', 'ssn_flag', 'phone_flag', 'credit_card_flag', 'iban_flag', 'ip_address_flag',
+    'pii_flag_inference', 'pii_flag', 'duplicate_flag', 'near_duplicate_flag', 'missing_message', 'missing_name',
+    'language_quality_flag', 'language_bias_flag', 'relevance_flag',
+]
+FLAGS_DTYPE = np.uint32
+PRESENT_SHIFT = 16
+
+# relevance_flag is True for relevant messages and None when no answer was usable. Its bit marks irrelevant
+# rows, so that every value bit marks an issue, and this bit marks the None rows.
+RELEVANCE_UNKNOWN_BIT = FLAGS_DTYPE(1 << 15)
+
+# Check columns holding text labels rather than flags; kept as categoricals, besides the *_decided_by tiers
+LABEL_COLUMNS = ['gender_bias_flag', 'pii_flag_details', 'lexicon_categories']
+
+PII_COLUMNS = [*PACKED_COLUMNS[:6], 'pii_flag_inference']
+QUALITY_COLUMNS = ['duplicate_flag', 'near_duplicate_flag', 'missing_message', 'missing_name',
+                   'language_quality_flag', 'relevance_flag']
+
+
+def is_label(column):
+    return column in LABEL_COLUMNS or column.endswith('_decided_by')
+
+
+def value_bit(column):
+    return FLAGS_DTYPE(1 << PACKED_COLUMNS.index(column))
+
+
+def present_bit(column):
+    return FLAGS_DTYPE(1 << (PRESENT_SHIFT + PACKED_COLUMNS.index(column)))
+
+
+def _bits(df):
+    return df[FLAGS_COLUMN].to_numpy(dtype=FLAGS_DTYPE)
+
+
+def _column_bits(columns):
+    """Value and presence bits of the packed columns among columns."""
+    value = present = FLAGS_DTYPE(0)
+    for column in columns:
+        if column in PACKED_COLUMNS:
+            value |= value_bit(column)
+            present |= present_bit(column)
+    return value, present
+
+
+def pack_flags(df):
+    """Moves the boolean check columns of df into the FLAGS_COLUMN bitmask and makes label columns categorical.
+
+    Four bytes per row replace a byte per flag plus the Python objects of the
+    nullable relevance_flag, a category code replaces each repeated label
+    string and cluster ids shrink to int32. Works in place and returns df.
+    Columns packed earlier are kept, so a frame can be packed again after more
+    checks have run on it.
+    """
+    columns = [column for column in PACKED_COLUMNS if column in df.columns]
+    bits = _bits(df).copy() if FLAGS_COLUMN in df.columns else np.zeros(len(df), dtype=FLAGS_DTYPE)
+    if columns:
+        value, present = _column_bits(columns)
+        bits &= ~(value | present | RELEVANCE_UNKNOWN_BIT) if 'relevance_flag' in columns else ~(value | present)
+    for column in columns:
+        if column == 'relevance_flag':
+            values = df[column].eq(False).to_numpy()
+            bits[df[column].isna().to_numpy()] |= RELEVANCE_UNKNOWN_BIT
+        else:
+            values = df[column].to_numpy(dtype=bool, na_value=False)
+        bits[values] |= value_bit(column)
+        bits |= present_bit(column)
+
+    df.drop(columns=columns, inplace=True)
+    df[FLAGS_COLUMN] = bits
+    for column in df.columns:
+        if column.endswith('_cluster'):
+            df[column] = df[column].astype(np.int32)
+        elif is_label(column) and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    return df
+
+
+def packed_columns(df):
+    """The columns packed into df's bitmask, in bit order."""
+    if FLAGS_COLUMN not in df.columns or not len(df):
+        return []
+    present = int(np.bitwise_or.reduce(_bits(df))) >> PRESENT_SHIFT
+    return [column for i, column in enumerate(PACKED_COLUMNS) if present >> i & 1]
+
+
+def has_flag(df, column):
+    return column in df.columns or column in packed_columns(df)
+
+
+def flag_values(df, column):
+    """One check column as it was before packing: bool, or True/False/None for relevance_flag."""
+    if column in df.columns:
+        return df[column]
+    bits = _bits(df)
+    is_set = (bits & value_bit(column)) != 0
+    if column != 'relevance_flag':
+        return pd.Series(is_set, index=df.index, name=column)
+    values = pd.Series(~is_set, index=df.index, name=column, dtype=object)
+    values[(bits & RELEVANCE_UNKNOWN_BIT) != 0] = None
+    return values
+
+
+def unpack_flags(df, columns=None):
+    """A copy of df with the packed columns (or only those in columns) decoded, for display and export."""
+    if FLAGS_COLUMN not in df.columns:
+        return df
+    unpacked = df.drop(columns=FLAGS_COLUMN)
+    for column in packed_columns(df) if columns is None else columns:
+        unpacked[column] = flag_values(df, column)
+    return unpacked
+
+
+def select_flags(df, columns):
+    """df's bitmask with every packed column not in columns cleared."""
+    value, present = _column_bits(columns)
+    keep = value | present | (RELEVANCE_UNKNOWN_BIT if 'relevance_flag' in columns else FLAGS_DTYPE(0))
+    return pd.Series(_bits(df) & keep, index=df.index, name=FLAGS_COLUMN)
+
+
+def count_flags(df):
+    """Number of rows each packed column is set on (irrelevant rows for relevance_flag)."""
+    bits = _bits(df)
+    return {column: int(np.count_nonzero(bits & value_bit(column))) for column in packed_columns(df)}
+
+
+def any_flag(df, columns):
+    """True for rows where any of columns is set (or False, for relevance_flag).
+
+    Packed columns are tested with a single AND over the bitmask; columns
+    added since the frame was packed are ORed in as ordinary columns.
+    """
+    mask = np.zeros(len(df), dtype=bool)
+    if FLAGS_COLUMN in df.columns:
+        value, _ = _column_bits([column for column in columns if column not in df.columns])
+        mask |= (_bits(df) & value) != 0
+    for column in columns:
+        if column not in df.columns:
+            continue
+        if column == 'relevance_flag':
+            mask |= df[column].eq(False).to_numpy()
+        else:
+            mask |= df[column].to_numpy(dtype=bool, na_value=False)
+    return pd.Series(mask, index=df.index)
+
+
+def any_pii(df):
+    """Rows with PII found by any regex type or by the LLM."""
+    return any_flag(df, PII_COLUMNS)
+
+
+def any_quality_issue(df):
+    """Rows that are duplicated, incomplete, poorly written or irrelevant."""
+    return any_flag(df, QUALITY_COLUMNS)
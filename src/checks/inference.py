@@ -0,0 +1,262 @@
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures import wait as wait_for_futures
+
+from checks.cache import get_cache, make_key
+from checks.client import get_client
+from checks.metrics import get_metrics
+from checks.resilience import (DEFAULT_MAX_ATTEMPTS, CircuitBreaker, backoff_delay, backoff_window, is_retryable,
+                               retry_after_delay, retry_after_seconds)
+
+# Defaults sized to the Cerebras free-tier quota; override through the environment
+DEFAULT_MAX_IN_FLIGHT = int(os.getenv("CEREBRAS_MAX_IN_FLIGHT", "8"))
+DEFAULT_REQUESTS_PER_SECOND = float(os.getenv("CEREBRAS_REQUESTS_PER_SECOND", "5"))
+DEFAULT_BURST = int(os.getenv("CEREBRAS_BURST", "10"))
+# A request still unanswered after this many ms gets a duplicate and the first answer wins; 0 disables hedging
+DEFAULT_HEDGE_AFTER_MS = float(os.getenv("CEREBRAS_HEDGE_AFTER_MS", "0"))
+
+DEFAULT_MODEL = "llama3.1-8b"
+
+
+class InferenceCancelled(Exception):
+    """Raised by requests issued after cancel_requests()."""
+
+
+# Set while an analysis is being cancelled; queued requests then fail fast instead of reaching the API.
+# use_cancel_event replaces it with a per-job event, so cancelling one app session leaves the others running.
+_cancelled = threading.Event()
+_cancel_event = contextvars.ContextVar("inference_cancel_event", default=_cancelled)
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting how fast requests may be issued."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.spread = 0.0
+        self.lock = threading.Lock()
+
+    def pause(self, seconds, spread=0.0):
+        """Holds back every caller for seconds, e.g. when the API says the quota is used up.
+
+        Callers held back are released at random over the following spread
+        seconds rather than all at once, and no tokens build up meanwhile, so
+        the quota is not hit by a burst the moment the pause ends.
+        """
+        with self.lock:
+            until = time.monotonic() + seconds
+            if until > self.paused_until:
+                self.paused_until = until
+                self.spread = spread
+                self.tokens = 0
+                self.updated = until
+
+    def acquire(self):
+        """Blocks until a token is available, then consumes it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now + random.uniform(0, self.spread)
+                elif self.rate <= 0:
+                    return
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class InferenceExecutor:
+    """Bounded thread pool shared by all LLM-backed checks, with the rate limiter and circuit breaker they share.
+
+    With hedge_after_ms > 0 requests are sent from a second pool, so a slow
+    one can be duplicated while its caller waits.
+    """
+
+    def __init__(self, max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+                 requests_per_second=DEFAULT_REQUESTS_PER_SECOND, burst=DEFAULT_BURST,
+                 hedge_after_ms=DEFAULT_HEDGE_AFTER_MS):
+        self.max_in_flight = max_in_flight
+        self.limiter = TokenBucket(requests_per_second, burst)
+        self.breaker = CircuitBreaker()
+        self.hedge_after = hedge_after_ms / 1000
+        self.pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="inference")
+        self.hedge_pool = (ThreadPoolExecutor(max_workers=2 * max_in_flight, thread_name_prefix="hedge")
+                           if self.hedge_after > 0 else None)
+
+    def map(self, func, items):
+        """Runs func over items concurrently and returns the results in input order.
+
+        Each call runs in a copy of the caller's context, so the job's run
+        metrics and cancel event (see use_metrics, use_cancel_event) apply.
+        """
+        context = contextvars.copy_context()
+        return list(self.pool.map(lambda item: context.copy().run(func, item), items))
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True)
+        if self.hedge_pool is not None:
+            self.hedge_pool.shutdown(wait=False)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Returns the process-wide inference executor, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = InferenceExecutor()
+        return _executor
+
+
+def configure_executor(max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+                       requests_per_second=DEFAULT_REQUESTS_PER_SECOND, burst=DEFAULT_BURST,
+                       hedge_after_ms=DEFAULT_HEDGE_AFTER_MS):
+    """Replaces the shared executor, e.g. to match a different API quota."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+        _executor = InferenceExecutor(max_in_flight, requests_per_second, burst, hedge_after_ms)
+        return _executor
+
+
+def cancel_requests():
+    """Makes every request not yet sent raise InferenceCancelled, until resume_requests() is called.
+
+    Only affects contexts without their own event from use_cancel_event.
+    """
+    _cancelled.set()
+
+
+def resume_requests():
+    _cancelled.clear()
+
+
+def use_cancel_event(event):
+    """Makes requests of the current context (and the inference threads serving it) stop once event is set."""
+    _cancel_event.set(event)
+    return event
+
+
+def _send(executor, client, kwargs):
+    """Sends one request once the rate limiter allows it, recording its latency and token usage."""
+    waited = time.perf_counter()
+    executor.limiter.acquire()
+    if _cancel_event.get().is_set():
+        raise InferenceCancelled("Inference was cancelled")
+    start = time.perf_counter()
+    try:
+        response = (client or get_client()).chat.completions.create(**kwargs)
+    except Exception:
+        get_metrics().record_request(time.perf_counter() - start, failed=True, throttle_seconds=start - waited)
+        raise
+    get_metrics().record_request(time.perf_counter() - start, getattr(response, "usage", None),
+                                 throttle_seconds=start - waited)
+    return response
+
+
+def _send_hedged(executor, client, kwargs):
+    """_send, plus a duplicate request once the first has been waiting executor.hedge_after; the first answer wins."""
+    primary = executor.hedge_pool.submit(contextvars.copy_context().run, _send, executor, client, kwargs)
+    try:
+        return primary.result(timeout=executor.hedge_after)
+    except FutureTimeout:
+        pass
+    hedge = executor.hedge_pool.submit(contextvars.copy_context().run, _send, executor, client, kwargs)
+    pending = {primary, hedge}
+    while pending:
+        done, pending = wait_for_futures(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                get_metrics().record_hedge(won=future is hedge)
+                return future.result()
+            error = future.exception()
+    get_metrics().record_hedge(won=False)
+    raise error
+
+
+def create_completion(client=None, **kwargs):
+    """Issues a chat completion through the shared rate limiter and circuit breaker, retrying transient errors.
+
+    Connection errors, timeouts, rate limits and server errors are retried up
+    to DEFAULT_MAX_ATTEMPTS times after a jittered exponential backoff, added
+    to the wait the rate-limit headers ask for if there is one; such a wait
+    also pauses the shared limiter, so other threads stop hitting the quota
+    too. Raises CircuitOpen without sending anything while the endpoint
+    is down (see checks.resilience).
+    """
+    executor = get_executor()
+    send = _send_hedged if executor.hedge_pool is not None else _send
+    for attempt in range(DEFAULT_MAX_ATTEMPTS):
+        probe = executor.breaker.allow()
+        try:
+            response = send(executor, client, kwargs)
+        except InferenceCancelled:
+            # A cancelled probe says nothing about the endpoint; without this the circuit would stay half-open
+            if probe:
+                executor.breaker.release()
+            raise
+        except Exception as e:
+            status = getattr(e, "status_code", None)
+            # Any answer, a rate limit included, shows the endpoint is up; only other failures open the circuit
+            if status is not None and (status == 429 or not is_retryable(e)):
+                executor.breaker.record_success()
+            elif is_retryable(e):
+                executor.breaker.record_failure()
+            elif probe:
+                executor.breaker.release()
+            if not is_retryable(e):
+                raise
+            if attempt == DEFAULT_MAX_ATTEMPTS - 1:
+                raise
+            requested = retry_after_seconds(e)
+            if requested:
+                executor.limiter.pause(requested, backoff_window(attempt))
+            delay = retry_after_delay(requested, attempt) if requested else backoff_delay(attempt)
+            logging.warning(f"Inference request failed ({e}); retry {attempt + 1} in {delay:.1f} s.")
+            get_metrics().record_retry("completion", delay)
+            if _cancel_event.get().wait(delay):
+                raise InferenceCancelled("Inference was cancelled")
+            continue
+        executor.breaker.record_success()
+        return response
+
+
+def chat(system_prompt, text, model=DEFAULT_MODEL, max_completion_tokens=20, temperature=0.2, use_cache=True, client=None):
+    """Returns the completion text for a system prompt and user message, using the persistent cache."""
+    cache = get_cache() if use_cache else None
+    params = {"max_completion_tokens": max_completion_tokens, "temperature": temperature}
+    key = make_key(model, system_prompt, params, text) if cache is not None else None
+    if cache is not None:
+        cached = cache.get(key)
+        get_metrics().record_cache(cached is not None)
+        if cached is not None:
+            return cached
+    response = create_completion(
+        client,
+        messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": text}],
+        model=model,
+        **params
+    )
+    content = response.choices[0].message.content
+    if cache is not None:
+        cache.put(key, content, model=model)
+    return content
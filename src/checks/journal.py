@@ -0,0 +1,143 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+from checks.batching import TIER_UNDETERMINED
+from checks.cache import DEFAULT_MAX_AGE_DAYS
+
+DEFAULT_JOURNAL_DIR = os.getenv(
+    "EVADENCE_JOURNAL_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "journals"),
+)
+
+# Rows per journal record; a crash loses at most one block of inference work per check
+DEFAULT_BLOCK_ROWS = int(os.getenv("EVADENCE_JOURNAL_BLOCK_ROWS", "500"))
+
+# Journals not written to for this long are discarded; they hold results that the inference cache would have expired
+DEFAULT_JOURNAL_MAX_AGE_DAYS = float(os.getenv("EVADENCE_JOURNAL_MAX_AGE_DAYS", str(DEFAULT_MAX_AGE_DAYS)))
+
+
+def fingerprint_source(source):
+    """SHA-256 of a CSV given as a path, a file-like object or raw bytes."""
+    digest = hashlib.sha256()
+    if isinstance(source, bytes):
+        digest.update(source)
+    elif hasattr(source, "read"):
+        source.seek(0)
+        for block in iter(lambda: source.read(1 << 20), b""):
+            digest.update(block if isinstance(block, bytes) else block.encode("utf-8"))
+        source.seek(0)
+    else:
+        with open(source, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint_config(config):
+    """Short hash of a JSON-serializable check configuration."""
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class JobJournal:
+    """Append-only record of finished row blocks, so an interrupted job can resume.
+
+    Each line is a JSON object holding one check's output columns for one
+    block of rows. Lines are flushed and fsynced as blocks finish; a torn last
+    line from a crash is cut off on reload. finish() deletes the journal once
+    every block is recorded, so only interrupted jobs leave one behind.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.completed = {}
+        # Set when a block is left out because the API left rows undetermined
+        self.incomplete = False
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if os.path.exists(path):
+            with open(path, "rb+") as file:
+                data = file.read()
+                for line in data.splitlines():
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.completed[(record["check"], record["start"], record["rows"])] = record["columns"]
+                # Drop a torn last line, so the next record starts on a line of its own
+                complete = data.rfind(b"\n") + 1
+                if complete < len(data):
+                    file.truncate(complete)
+        if self.completed:
+            logging.info(f"Resuming job from {path}: {len(self.completed)} completed blocks.")
+        self._file = open(path, "a", encoding="utf-8")
+
+    def get(self, check, start, rows):
+        """Returns the recorded columns of a block as a dict of lists, or None if it has not finished."""
+        return self.completed.get((check, str(start), rows))
+
+    def record(self, check, start, frame):
+        """Appends the columns of a finished block and forces them to disk."""
+        columns = {column: frame[column].tolist() for column in frame.columns}
+        line = json.dumps({"check": check, "start": str(start), "rows": len(frame), "columns": columns})
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.completed[(check, str(start), len(frame))] = columns
+
+    def close(self):
+        self._file.close()
+
+    def finish(self):
+        """Closes the journal of a job that ran to the end, deleting it unless a rerun has blocks left to ask for."""
+        self.close()
+        if not self.incomplete:
+            os.remove(self.path)
+
+
+def prune_journals(directory=DEFAULT_JOURNAL_DIR, max_age_days=DEFAULT_JOURNAL_MAX_AGE_DAYS):
+    """Deletes the journals in directory not written to for max_age_days."""
+    if not os.path.isdir(directory):
+        return
+    cutoff = time.time() - max_age_days * 86400
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".jsonl") and entry.stat().st_mtime < cutoff:
+            logging.info(f"Discarding stale job journal {entry.path}.")
+            os.remove(entry.path)
+
+
+def open_journal(dataset_fingerprint, config, directory=DEFAULT_JOURNAL_DIR):
+    """Opens (or resumes) the journal of a dataset/check-configuration pair, discarding stale journals first."""
+    prune_journals(directory)
+    return JobJournal(os.path.join(directory, f"{dataset_fingerprint[:16]}-{fingerprint_config(config)}.jsonl"))
+
+
+def run_journaled(journal, name, df, func, block_rows=DEFAULT_BLOCK_ROWS):
+    """Runs func over df block by block, reusing blocks already in the journal.
+
+    func(frame) returns a DataFrame of result columns aligned with frame.
+    The concatenated result has the same index and values as func(df) would.
+    Blocks with rows left undetermined by an unavailable API are not recorded,
+    so a rerun asks for them again.
+    """
+    results = []
+    for start in range(0, len(df), block_rows):
+        block = df.iloc[start:start + block_rows]
+        recorded = journal.get(name, block.index[0], len(block))
+        if recorded is not None:
+            results.append(pd.DataFrame(recorded, index=block.index).infer_objects())
+            continue
+        result = func(block)
+        tiers = [column for column in result.columns if column.endswith('_decided_by')]
+        if result[tiers].isin([TIER_UNDETERMINED]).any().any():
+            journal.incomplete = True
+        else:
+            journal.record(name, block.index[0], result)
+        results.append(result)
+    return pd.concat(results) if results else func(df)
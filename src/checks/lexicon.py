@@ -0,0 +1,154 @@
+import csv
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from collections import deque
+
+import pandas as pd
+
+# Bundled term,category table; point LEXICON_PATH at a larger one (profanity, competitor names, ...)
+DEFAULT_LEXICON_PATH = os.getenv(
+    "LEXICON_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "lexicons.csv"),
+)
+# Built automata are pickled here, keyed by a hash of the table; an empty string disables the cache
+DEFAULT_LEXICON_CACHE_DIR = os.getenv(
+    "LEXICON_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "lexicon_cache"),
+)
+
+# Label of messages without any lexicon match
+NO_MATCH = "none"
+
+# Bumped whenever the pickled layout of Lexicon changes
+CACHE_VERSION = 1
+
+_lexicon = None
+_lexicon_lock = threading.Lock()
+
+
+class Lexicon:
+    """Aho-Corasick automaton matching every term of a categorized lexicon in one pass.
+
+    terms is an iterable of (term, category) pairs. Terms match anywhere in the
+    lowercased text, like `term in text.lower()`, but the cost of a scan grows
+    with the length of the text, not with the number of terms. Each node
+    stores the categories of every term ending there as a bitmask, so a scan
+    returns the categories that hit rather than the terms.
+    """
+
+    def __init__(self, terms):
+        self.categories = []
+        goto = [{}]
+        output = [0]
+        for term, category in terms:
+            term = term.strip().lower()
+            if not term:
+                continue
+            if category not in self.categories:
+                self.categories.append(category)
+            node = 0
+            for char in term:
+                child = goto[node].get(char)
+                if child is None:
+                    child = len(goto)
+                    goto[node][char] = child
+                    goto.append({})
+                    output.append(0)
+                node = child
+            output[node] |= 1 << self.categories.index(category)
+
+        # Failure links, breadth first so every shorter suffix is linked before it is needed
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                target = goto[state].get(char, 0)
+                fail[child] = target if target != child else 0
+                output[child] |= output[fail[child]]
+
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+        self._all = (1 << len(self.categories)) - 1
+
+    def mask(self, text):
+        """Bitmask of the categories (bit i for categories[i]) with a term in text."""
+        goto, fail, output = self._goto, self._fail, self._output
+        node = found = 0
+        for char in str(text).lower():
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                found |= output[node]
+                if found == self._all:
+                    break
+        return found
+
+    def category_mask(self, categories):
+        """Bitmask of the given categories; categories the lexicon does not have are ignored."""
+        return sum(1 << i for i, category in enumerate(self.categories) if category in categories)
+
+    def match(self, text):
+        """The categories with a term in text, in lexicon order."""
+        found = self.mask(text)
+        return [category for i, category in enumerate(self.categories) if found >> i & 1]
+
+    def label(self, text):
+        """The matched categories joined with ', ', or NO_MATCH."""
+        return ", ".join(self.match(text)) or NO_MATCH
+
+    def match_column(self, series):
+        """Categorical Series of label() per value, scanning each distinct value once; nulls stay null."""
+        codes, uniques = pd.factorize(series)
+        labels = [self.label(text) for text in uniques]
+        categories = sorted(set(labels))
+        mapping = [categories.index(label) for label in labels]
+        values = [mapping[code] if code >= 0 else -1 for code in codes]
+        return pd.Series(pd.Categorical.from_codes(values, categories=categories), index=series.index)
+
+
+def read_terms(path=DEFAULT_LEXICON_PATH):
+    """Reads a term,category table into (term, category) pairs."""
+    with open(path, newline="", encoding="utf-8") as file:
+        return [(row["term"], row["category"].strip().lower()) for row in csv.DictReader(file)]
+
+
+def load_lexicon(path=DEFAULT_LEXICON_PATH, cache_dir=DEFAULT_LEXICON_CACHE_DIR):
+    """Builds the automaton for a lexicon table, reusing the copy pickled by an earlier build of the same table."""
+    with open(path, "rb") as file:
+        digest = hashlib.sha256(file.read() + f"\0{CACHE_VERSION}".encode()).hexdigest()
+    cache_path = os.path.join(cache_dir, f"{digest}.pickle") if cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as file:
+                return pickle.load(file)
+        except Exception as e:
+            logging.warning(f"Rebuilding lexicon, cached copy {cache_path} is unreadable: {e}")
+
+    lexicon = Lexicon(read_terms(path))
+    if cache_path:
+        # Written under a temporary name first, so concurrent workers never read a partial file
+        os.makedirs(cache_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=cache_dir, suffix=".tmp", delete=False) as file:
+            pickle.dump(lexicon, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(file.name, cache_path)
+    return lexicon
+
+
+def get_lexicon():
+    """Returns the shared lexicon, building or loading it on first use."""
+    global _lexicon
+    with _lexicon_lock:
+        if _lexicon is None:
+            _lexicon = load_lexicon()
+        return _lexicon
@@ -0,0 +1,183 @@
+import contextvars
+import json
+import threading
+import time
+
+import numpy as np
+
+# Upper bounds (ms) of the request latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class RunMetrics:
+    """Thread-safe performance counters for one analysis run.
+
+    Collects wall time and rows per check, the latency of every completion
+    request, retries and backoff sleeps, fallbacks, token usage and cache
+    hits, hedged requests and rows left undetermined because the API was
+    unavailable. to_dict() returns a JSON-serializable snapshot.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.rows = 0
+        self.checks = {}
+        self.latencies = []
+        self.errors = 0
+        self.throttle_seconds = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.retries = {}
+        self.fallbacks = {}
+        self.hedges = 0
+        self.hedges_won = 0
+        self.undetermined = {}
+        self.saved_requests = {}
+        self._lock = threading.Lock()
+
+    def record_check(self, name, seconds, rows):
+        with self._lock:
+            entry = self.checks.setdefault(name, {"seconds": 0.0, "rows": 0, "runs": 0})
+            entry["seconds"] += seconds
+            entry["rows"] += rows
+            entry["runs"] += 1
+
+    def record_rows(self, rows):
+        with self._lock:
+            self.rows += rows
+
+    def record_request(self, seconds, usage=None, failed=False, throttle_seconds=0.0):
+        with self._lock:
+            self.latencies.append(seconds)
+            self.throttle_seconds += throttle_seconds
+            if failed:
+                self.errors += 1
+            if usage is not None:
+                self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+                self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+    def record_cache(self, hit):
+        with self._lock:
+            if hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+
+    def record_retry(self, name, backoff_seconds=0.0):
+        with self._lock:
+            entry = self.retries.setdefault(name, {"count": 0, "backoff_seconds": 0.0})
+            entry["count"] += 1
+            entry["backoff_seconds"] += backoff_seconds
+
+    def record_fallback(self, name):
+        with self._lock:
+            self.fallbacks[name] = self.fallbacks.get(name, 0) + 1
+
+    def record_hedge(self, won):
+        with self._lock:
+            self.hedges += 1
+            if won:
+                self.hedges_won += 1
+
+    def record_undetermined(self, name):
+        with self._lock:
+            self.undetermined[name] = self.undetermined.get(name, 0) + 1
+
+    def record_saved_requests(self, name, count):
+        """Counts inputs a local rule decided completely, so no request was sent for them."""
+        with self._lock:
+            self.saved_requests[name] = self.saved_requests.get(name, 0) + count
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    def to_dict(self):
+        with self._lock:
+            elapsed = (self.finished or time.perf_counter()) - self.started
+            latencies_ms = np.array(self.latencies) * 1000
+            counts = np.histogram(latencies_ms, bins=[0, *LATENCY_BUCKETS_MS, np.inf])[0] if len(latencies_ms) else []
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                "elapsed_seconds": round(elapsed, 3),
+                "rows": self.rows,
+                "rows_per_sec": round(self.rows / elapsed, 1) if elapsed else None,
+                "checks": {
+                    name: {**entry, "seconds": round(entry["seconds"], 3),
+                           "rows_per_sec": round(entry["rows"] / entry["seconds"], 1) if entry["seconds"] else None}
+                    for name, entry in self.checks.items()
+                },
+                "requests": {
+                    "count": len(self.latencies),
+                    "errors": self.errors,
+                    "p50_ms": round(float(np.percentile(latencies_ms, 50)), 1) if len(latencies_ms) else None,
+                    "p95_ms": round(float(np.percentile(latencies_ms, 95)), 1) if len(latencies_ms) else None,
+                    "p99_ms": round(float(np.percentile(latencies_ms, 99)), 1) if len(latencies_ms) else None,
+                    "max_ms": round(float(latencies_ms.max()), 1) if len(latencies_ms) else None,
+                    "histogram": [
+                        {"le_ms": bound, "count": int(count)}
+                        for bound, count in zip([*LATENCY_BUCKETS_MS, None], counts)
+                    ],
+                    "rate_limit_wait_seconds": round(self.throttle_seconds, 3),
+                },
+                "tokens": {
+                    "prompt": self.prompt_tokens,
+                    "completion": self.completion_tokens,
+                    "total": self.prompt_tokens + self.completion_tokens,
+                },
+                "cache": {
+                    "hits": self.cache_hits,
+                    "misses": self.cache_misses,
+                    "hit_rate": round(self.cache_hits / lookups, 3) if lookups else None,
+                },
+                "retries": {name: {**entry, "backoff_seconds": round(entry["backoff_seconds"], 3)}
+                            for name, entry in self.retries.items()},
+                "fallbacks": dict(self.fallbacks),
+                "hedges": {"sent": self.hedges, "won": self.hedges_won},
+                "undetermined": dict(self.undetermined),
+                "saved_requests": dict(self.saved_requests),
+            }
+
+    def to_json(self, path=None):
+        """Returns the snapshot as JSON, and also writes it to path if given."""
+        text = json.dumps(self.to_dict(), indent=2)
+        if path:
+            with open(path, "w") as file:
+                file.write(text)
+        return text
+
+
+_metrics = RunMetrics()
+_metrics_lock = threading.Lock()
+
+# Set by use_metrics, so concurrent analyses in one process (app sessions) keep separate counters
+_context_metrics = contextvars.ContextVar("run_metrics", default=None)
+
+
+def get_metrics():
+    """Returns the metrics of the current run: those given to use_metrics in this context, else the process-wide ones."""
+    metrics = _context_metrics.get()
+    if metrics is not None:
+        return metrics
+    with _metrics_lock:
+        return _metrics
+
+
+def use_metrics(metrics):
+    """Records the checks and requests of the current context into metrics instead of the process-wide run.
+
+    The context is the calling thread plus the inference threads working on
+    its behalf (see checks.inference.InferenceExecutor.map).
+    """
+    _context_metrics.set(metrics)
+    return metrics
+
+
+def reset_metrics():
+    """Starts a new run's metrics and returns them."""
+    global _metrics
+    with _metrics_lock:
+        _metrics = RunMetrics()
+        return _metrics
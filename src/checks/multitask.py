@@ -0,0 +1,123 @@
+import json
+import logging
+import re
+
+import pandas as pd
+
+from checks.batching import TIER_LLM, TIER_RULE, classify_column, expand_labels, normalized_keys, single_label
+from checks.inference import InferenceCancelled, chat, get_executor
+from checks.metrics import get_metrics
+from checks.resilience import CircuitOpen
+from checks.quality_check import RELEVANCE_TASK
+from checks.compliance_check import PII_TASK
+from checks.bias_check import LANGUAGE_BIAS_TASK
+
+# Per-message LLM checks that can share one request:
+#   JSON key -> (task, flag column, decided-by column, default, allowed answers)
+MESSAGE_CHECKS = {
+    "relevance": (RELEVANCE_TASK, "relevance_flag", "relevance_decided_by", None, "'relevant' or 'irrelevant'"),
+    "pii": (PII_TASK, "pii_flag_inference", "pii_inference_decided_by", False, "'contains pii' or 'no pii'"),
+    "language_bias": (LANGUAGE_BIAS_TASK, "language_bias_flag", "language_bias_decided_by", False, "'contains bias' or 'no bias'"),
+}
+
+JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+
+def build_evaluation_prompt(checks):
+    """Combines the system prompts of the selected checks into one JSON-answer prompt."""
+    lines = [
+        "You evaluate customer support messages for several independent tasks at once. "
+        "Answer with a single JSON object and nothing else, using exactly these keys:"
+    ]
+    for key in checks:
+        task, _, _, _, answers = MESSAGE_CHECKS[key]
+        lines.append(f'- "{key}": {answers}. Task: {task.system_prompt}')
+    return "\n".join(lines)
+
+
+def parse_evaluation(content):
+    """Extracts the JSON object from the model's answer; returns {} if there is none."""
+    match = JSON_OBJECT.search(content)
+    if not match:
+        return {}
+    try:
+        parsed = json.loads(match.group(0))
+    except ValueError:
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def evaluate_message(message, checks, client=None):
+    """Runs the selected per-message checks in one request and returns ({key: label}, {key: tier}).
+
+    Checks whose precheck decides the message locally are left out of the
+    request; any check whose answer is missing from the JSON falls back to its
+    own single-task call, and is left undetermined if that fails too.
+    """
+    labels = {}
+    tiers = {}
+    for key in checks:
+        precheck = MESSAGE_CHECKS[key][0].precheck
+        label = precheck(message) if precheck is not None else None
+        if label is not None:
+            labels[key] = label
+            tiers[key] = TIER_RULE
+    remaining = [key for key in checks if key not in labels]
+    tiers.update((key, TIER_LLM) for key in remaining)
+
+    answers = {}
+    if len(remaining) > 1:
+        try:
+            answers = parse_evaluation(
+                chat(build_evaluation_prompt(remaining), message, max_completion_tokens=20 * len(remaining) + 20,
+                     client=client)
+            )
+        except InferenceCancelled:
+            raise
+        except CircuitOpen:
+            # The per-check calls below fail fast as well and leave the message undetermined
+            pass
+        except Exception as e:
+            logging.warning(f"Combined evaluation failed ({e}). Falling back to one request per check.")
+            get_metrics().record_fallback("combined evaluation")
+
+    for key in remaining:
+        task, _, _, default, _ = MESSAGE_CHECKS[key]
+        answer = answers.get(key)
+        if isinstance(answer, str) and answer.strip():
+            labels[key] = task.parse(answer, message)
+        else:
+            labels[key], tiers[key] = single_label(task, message, default)
+    return labels, tiers
+
+
+def evaluate_messages(series, checks, client=None):
+    """Fills the flag and decided-by columns of every selected check with at most one request per unique message.
+
+    Returns a DataFrame aligned with series.index.
+    """
+    checks = [key for key in MESSAGE_CHECKS if key in checks]
+    if len(checks) == 1:
+        # Nothing to combine; the single-task path can still use batching
+        task, column, tier_column, default, _ = MESSAGE_CHECKS[checks[0]]
+        flags, tiers = classify_column(series, task, default=default, client=client, with_tiers=True)
+        return pd.DataFrame({column: flags, tier_column: tiers}, index=series.index)
+
+    values = series[series.notnull()]
+    keys = normalized_keys(values)
+
+    unique = {}
+    for key, text in zip(keys, values):
+        unique.setdefault(key, text)
+    results = dict(zip(unique, get_executor().map(lambda text: evaluate_message(text, checks, client=client), unique.values())))
+    # A message needs its request unless the prechecks decided every selected check
+    saved = sum(all(tier == TIER_RULE for tier in tiers.values()) for _, tiers in results.values())
+    if saved:
+        get_metrics().record_saved_requests("+".join(checks), saved)
+
+    out = pd.DataFrame(index=series.index)
+    for check in checks:
+        _, column, tier_column, default, _ = MESSAGE_CHECKS[check]
+        out[column] = expand_labels(series, keys, {key: result[0][check] for key, result in results.items()}, default)
+        out[tier_column] = expand_labels(series, keys, {key: result[1][check] for key, result in results.items()}, None)
+    return out
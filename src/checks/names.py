@@ -0,0 +1,57 @@
+import csv
+import os
+import re
+import threading
+import unicodedata
+
+# Bundled first-name table (name,gender); override with a larger table through the environment
+DEFAULT_NAME_TABLE = os.getenv(
+    "NAME_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "first_names.csv"),
+)
+
+TITLES = {"mr", "mrs", "ms", "miss", "mx", "dr", "prof", "sir", "madam", "dame", "rev"}
+NAME_TOKEN = re.compile(r"[^\W\d_]+(?:['-][^\W\d_]+)*")
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def normalize_name(name):
+    """Casefolds a name and strips accents, so 'José' and 'jose ' share one entry."""
+    decomposed = unicodedata.normalize("NFKD", str(name).strip().casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def extract_first_name(name):
+    """Returns the normalized first name of a full name ('Dr. Alice Smith' -> 'alice'), or None."""
+    for token in NAME_TOKEN.findall(normalize_name(name)):
+        if token not in TITLES:
+            return token
+    return None
+
+
+def load_name_index(path=DEFAULT_NAME_TABLE):
+    """Reads a name,gender table into a dict keyed by normalized first name."""
+    index = {}
+    with open(path, newline="", encoding="utf-8") as file:
+        for row in csv.DictReader(file):
+            index[normalize_name(row["name"])] = row["gender"].strip().lower()
+    return index
+
+
+def get_name_index():
+    """Returns the shared name index, loading the table on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = load_name_index()
+        return _index
+
+
+def lookup_gender(name):
+    """Returns 'male', 'female' or 'unknown' for names in the index, or None when the name is not listed."""
+    first_name = extract_first_name(name)
+    if first_name is None:
+        return None
+    return get_name_index().get(first_name)
@@ -0,0 +1,122 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+DEFAULT_NUM_PERM = 64
+DEFAULT_SHINGLE_SIZE = 5
+
+# Universal hashing modulo a Mersenne prime; 31-bit inputs keep a * x + b inside uint64
+MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+MAX_HASH = (1 << 31) - 1
+SHINGLE_BASE = np.uint64(257)
+
+PUNCTUATION = re.compile(r"[^\w\s]")
+DIGITS = re.compile(r"\d+")
+
+
+def normalize_message(text):
+    """Lowercases, drops punctuation, masks numbers (order IDs, amounts) and collapses whitespace."""
+    text = DIGITS.sub("0", PUNCTUATION.sub(" ", str(text).lower()))
+    return " ".join(text.split())
+
+
+def minhash_signatures(texts, a, b, shingle_size=DEFAULT_SHINGLE_SIZE, block=4096):
+    """MinHash signature per text over its character shingles, one column per hash function.
+
+    Each block of texts is concatenated into one code-point array; every
+    shingle is hashed with a vectorized polynomial rolling hash, and the
+    permuted hashes are reduced per text with a single np.minimum.reduceat.
+    """
+    signatures = np.empty((len(texts), len(a)), dtype=np.uint64)
+    for start in range(0, len(texts), block):
+        # Texts shorter than a shingle are padded so they still yield one shingle
+        chunk = [text.ljust(shingle_size, "\0") for text in texts[start:start + block]]
+        lengths = np.fromiter((len(text) for text in chunk), dtype=np.int64, count=len(chunk))
+        codes = np.frombuffer("".join(chunk).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+
+        positions = len(codes) - shingle_size + 1
+        hashes = np.zeros(positions, dtype=np.uint64)
+        for offset in range(shingle_size):
+            hashes = (hashes * SHINGLE_BASE + codes[offset:offset + positions]) % MERSENNE_PRIME
+
+        # Keep only shingles that lie entirely inside one text
+        ends = np.cumsum(lengths)
+        valid = np.arange(positions) + shingle_size <= np.repeat(ends, lengths)[:positions]
+        counts = lengths - shingle_size + 1
+        offsets = np.zeros(len(chunk), dtype=np.int64)
+        np.cumsum(counts[:-1], out=offsets[1:])
+
+        permuted = (a[:, None] * hashes[valid][None, :] + b[:, None]) % MERSENNE_PRIME
+        signatures[start:start + len(chunk)] = np.minimum.reduceat(permuted, offsets, axis=1).T
+    return signatures
+
+
+def choose_bands(num_perm, threshold):
+    """Picks bands x rows = num_perm whose LSH threshold (1/bands)^(1/rows) is closest to threshold."""
+    options = [(bands, num_perm // bands) for bands in range(1, num_perm + 1) if num_perm % bands == 0]
+    return min(options, key=lambda option: abs((1 / option[0]) ** (1 / option[1]) - threshold))
+
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+
+def find_near_duplicates(series, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM,
+                         shingle_size=DEFAULT_SHINGLE_SIZE, seed=1):
+    """Clusters near-duplicate texts with MinHash signatures and locality-sensitive hashing.
+
+    Identical normalized texts are collapsed first (the cheap exact path), so
+    signatures are computed once per distinct text. Candidates sharing an LSH
+    band are kept when their estimated Jaccard similarity reaches threshold.
+    Runs in roughly linear time. Returns an int array of cluster IDs aligned
+    with series; rows without a near duplicate (and missing values) get -1.
+    """
+    mask = series.notnull().to_numpy()
+    normalized = series[mask].map(normalize_message)
+    codes, uniques = pd.factorize(normalized)
+
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, MAX_HASH, size=num_perm).astype(np.uint64)
+    b = rng.randint(0, MAX_HASH, size=num_perm).astype(np.uint64)
+    signatures = minhash_signatures(uniques, a, b, shingle_size)
+
+    bands, rows = choose_bands(num_perm, threshold)
+    groups = _UnionFind(len(uniques))
+    for band in range(bands):
+        buckets = {}
+        for i, key in enumerate(map(bytes, signatures[:, band * rows:(band + 1) * rows])):
+            first = buckets.setdefault(key, i)
+            # Compare with the bucket's first member only, keeping each band linear
+            if first != i and np.mean(signatures[first] == signatures[i]) >= threshold:
+                groups.union(first, i)
+
+    # Unique texts are already exact duplicates of each other, so count rows per group
+    roots = np.array([groups.find(i) for i in range(len(uniques))], dtype=np.int64)
+    row_roots = roots[codes]
+    sizes = np.bincount(row_roots, minlength=len(uniques))
+    row_clusters = np.where(sizes[row_roots] > 1, row_roots, -1)
+
+    # Renumber clusters 0..k-1 in order of first appearance
+    clustered = row_clusters >= 0
+    _, first_seen, dense = np.unique(row_clusters[clustered], return_index=True, return_inverse=True)
+    order = np.argsort(np.argsort(first_seen))
+    row_clusters[clustered] = order[dense]
+
+    clusters = np.full(len(series), -1, dtype=np.int64)
+    clusters[mask] = row_clusters
+    return clusters
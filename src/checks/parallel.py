@@ -0,0 +1,121 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_WORKERS = int(os.getenv("EVADENCE_WORKERS", str(os.cpu_count() or 1)))
+
+# Shards per worker; more shards even out the load when some rows are slower to scan
+SHARDS_PER_WORKER = 4
+
+# Text columns shipped to the workers
+TEXT_COLUMNS = ("customer_message", "name", "contact_info")
+
+
+def pack_columns(df, columns):
+    """Copies text columns into one shared-memory block laid out like an Arrow string array.
+
+    Each column is stored as concatenated UTF-8 bytes, int64 offsets and a null
+    mask. Workers attach to the block by name and decode only their own rows,
+    so the DataFrame is never pickled. Returns (block, layout).
+    """
+    parts = []
+    layout = {}
+    position = 0
+    for column in columns:
+        values = df[column].tolist()
+        nulls = np.fromiter((pd.isnull(value) for value in values), dtype=bool, count=len(values))
+        encoded = [b"" if null else str(value).encode("utf-8") for value, null in zip(values, nulls)]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        data = b"".join(encoded)
+
+        entry = {}
+        for name, buffer in (("offsets", offsets.tobytes()), ("nulls", nulls.tobytes()), ("data", data)):
+            entry[name] = (position, len(buffer))
+            parts.append(buffer)
+            position += len(buffer)
+        layout[column] = entry
+
+    block = shared_memory.SharedMemory(create=True, size=max(position, 1))
+    position = 0
+    for buffer in parts:
+        block.buf[position:position + len(buffer)] = buffer
+        position += len(buffer)
+    return block, layout
+
+
+def unpack_rows(buf, layout, start, stop):
+    """Rebuilds rows start..stop of the packed columns as a DataFrame."""
+    columns = {}
+    for column, entry in layout.items():
+        offset, size = entry["offsets"]
+        offsets = np.frombuffer(buf, dtype=np.int64, count=size // 8, offset=offset)
+        offset, size = entry["nulls"]
+        nulls = np.frombuffer(buf, dtype=bool, count=size, offset=offset)
+        data_offset = entry["data"][0]
+        columns[column] = [
+            None if nulls[row] else
+            bytes(buf[data_offset + offsets[row]:data_offset + offsets[row + 1]]).decode("utf-8")
+            for row in range(start, stop)
+        ]
+    return pd.DataFrame(columns, index=pd.RangeIndex(start, stop))
+
+
+def _run_shard(block_name, layout, start, stop, names, with_hashes):
+    # Imported here so spawned workers register the checks themselves
+    from checks.pipeline import select_checks
+    from checks.quality_check import hash_messages
+
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        shard = unpack_rows(block.buf, layout, start, stop)
+    finally:
+        block.close()
+
+    results = [check.func(shard) for check in select_checks(names)]
+    if with_hashes:
+        results.append(pd.DataFrame({'_message_hash': hash_messages(shard['customer_message'])}, index=shard.index))
+    return pd.concat(results, axis=1) if results else pd.DataFrame(index=shard.index)
+
+
+def run_local_checks(df, checks, workers=DEFAULT_WORKERS):
+    """Runs non-LLM checks across a process pool and returns {check name: result DataFrame}.
+
+    Row-local checks run per shard; duplicate detection is split into hashing
+    in the workers and a single duplicated() over the hashes here. Results are
+    reassembled in the original row order and index.
+    """
+    shardable = [check.name for check in checks if not check.uses_llm and not check.cross_row]
+    with_hashes = any(check.name == "duplicates" for check in checks)
+    if not len(df) or not (shardable or with_hashes):
+        return {}
+
+    columns = [column for column in TEXT_COLUMNS if column in df.columns]
+    shard_rows = max(1, -(-len(df) // (workers * SHARDS_PER_WORKER)))
+    bounds = [(start, min(start + shard_rows, len(df))) for start in range(0, len(df), shard_rows)]
+
+    block, layout = pack_columns(df, columns)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_run_shard, block.name, layout, start, stop, shardable, with_hashes)
+                for start, stop in bounds
+            ]
+            merged = pd.concat([future.result() for future in futures])
+    finally:
+        block.close()
+        block.unlink()
+    merged.index = df.index
+
+    results = {}
+    for check in checks:
+        if check.name in shardable:
+            results[check.name] = merged[list(check.columns)]
+    if with_hashes:
+        results["duplicates"] = pd.DataFrame(
+            {'duplicate_flag': pd.Series(merged['_message_hash']).duplicated(keep=False)}, index=df.index
+        )
+    return results
@@ -0,0 +1,116 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# PII types detected by the regex engine. Each type is matched on its own, so
+# a phone number inside an email address flags both. Adding a type here adds
+# a `<type>_flag` column.
+PII_PATTERNS = {
+    "email": r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}',
+    "ssn": r'\b\d{3}-\d{2}-\d{4}\b',
+    "phone": r'\b\d{3}-\d{4}\b|\b\d{3}-\d{3}-\d{4}\b',
+    "credit_card": r'\b(?:\d{4}[ -]?){3}\d{4}\b|\b\d{4}[ -]?\d{6}[ -]?\d{5}\b',
+    "iban": r'\b[A-Z]{2}\d{2}(?: ?[A-Z0-9]{4}){2,7}(?: ?[A-Z0-9]{1,3})?\b',
+    "ip_address": r'\b(?:(?:25[0-5]|2[0-4]\d|1?\d?\d)\.){3}(?:25[0-5]|2[0-4]\d|1?\d?\d)\b',
+}
+
+# Display names used in the report
+PII_LABELS = {
+    "email": "Email",
+    "ssn": "SSN",
+    "phone": "Phone",
+    "credit_card": "Credit Card",
+    "iban": "IBAN",
+    "ip_address": "IP Address",
+}
+
+# Types the report has always listed; the others are listed when the pii_regex check ran
+CORE_PII_TYPES = ["email", "ssn", "phone"]
+
+COMPILED_PATTERNS = {kind: re.compile(pattern) for kind, pattern in PII_PATTERNS.items()}
+
+# Cheap patterns every match of a type contains, so the full pattern only runs on the few values that have one.
+# Types without a hint are searched in every value.
+PII_HINTS = {
+    "email": "@",
+    "ssn": r'\d-\d',
+    "phone": r'\d-\d',
+    "credit_card": r'\d{4}[ -]?\d{4}',
+    "iban": r'[A-Z]{2}\d\d',
+    "ip_address": r'\d\.\d',
+}
+
+
+def flag_column(kind):
+    return f"{kind}_flag"
+
+
+def scan_column(series, spans=False):
+    """Flags the PII types in every value of series with one vectorized search per type.
+
+    Returns (flags, spans): a boolean array of shape (len(series), number of
+    PII types) in PII_PATTERNS order, and with spans=True a list holding, per
+    row, the (type, start, end) of each match (None otherwise). Types are
+    matched independently, so the flags equal those of the per-type detect_*
+    functions. Each type's pattern only runs on the values its PII_HINTS
+    pattern finds; spans are collected from the flagged values only.
+    """
+    strings = series.astype("string")
+    everything = np.ones(len(series), dtype=bool)
+    hinted = {}
+    flags = np.zeros((len(series), len(COMPILED_PATTERNS)), dtype=bool)
+    for i, (kind, pattern) in enumerate(COMPILED_PATTERNS.items()):
+        hint = PII_HINTS.get(kind)
+        if hint is not None and hint not in hinted:
+            hinted[hint] = strings.str.contains(hint, regex=hint != "@", na=False).to_numpy(dtype=bool)
+        candidates = hinted[hint] if hint is not None else everything
+        flags[candidates, i] = strings[candidates].str.contains(pattern, na=False).to_numpy(dtype=bool)
+    if not spans:
+        return flags, None
+
+    texts = strings.to_numpy(dtype=object)
+    found = [[] for _ in range(len(series))]
+    for i, (kind, pattern) in enumerate(COMPILED_PATTERNS.items()):
+        for row in np.flatnonzero(flags[:, i]):
+            found[row].extend((kind, match.start(), match.end()) for match in pattern.finditer(texts[row]))
+    return flags, found
+
+
+def scan_pii(df, columns=("customer_message", "contact_info"), spans=False):
+    """Detects every PII type across the given columns.
+
+    Returns a DataFrame with a `<type>_flag` column per PII type (True if any
+    column matched) and, with spans=True, a `pii_spans` column listing
+    (column, type, start, end) for every match so redaction needs no rescan.
+    """
+    flags = np.zeros((len(df), len(PII_PATTERNS)), dtype=bool)
+    all_spans = [[] for _ in range(len(df))]
+    for column in columns:
+        column_flags, column_spans = scan_column(df[column], spans=spans)
+        flags |= column_flags
+        if spans:
+            for row, found in enumerate(column_spans):
+                all_spans[row].extend((column, kind, start, end) for kind, start, end in found)
+
+    out = pd.DataFrame(flags, index=df.index, columns=[flag_column(kind) for kind in PII_PATTERNS])
+    if spans:
+        out['pii_spans'] = pd.Series(all_spans, index=df.index, dtype=object)
+    return out
+
+
+def redact(text, spans, column, placeholder="[{kind}]"):
+    """Replaces the PII spans recorded for `column` in text with a placeholder.
+
+    A span overlapping an earlier, or equally early but longer, one (a phone
+    number inside an email address) is covered by that span's placeholder.
+    """
+    matches = []
+    for start, end, kind in sorted((start, -end, kind) for span_column, kind, start, end in spans
+                                   if span_column == column):
+        if matches and start < matches[-1][1]:
+            continue
+        matches.append((start, -end, kind))
+    for start, end, kind in reversed(matches):
+        text = text[:start] + placeholder.format(kind=kind.upper()) + text[end:]
+    return text
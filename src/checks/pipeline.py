@@ -0,0 +1,88 @@
+import hashlib
+import time
+
+# Importing the check modules registers their checks
+import checks.quality_check  # noqa: F401
+import checks.compliance_check  # noqa: F401
+import checks.bias_check  # noqa: F401
+from checks.bias_check import GENDER_TASK
+from checks.inference import DEFAULT_MODEL
+from checks.metrics import get_metrics
+from checks.multitask import MESSAGE_CHECKS, evaluate_messages
+from checks.registry import CHECKS, get_check
+
+
+def select_checks(names=None):
+    """Returns the registered checks named in `names` (all of them by default) in registry order."""
+    if names is None:
+        return list(CHECKS.values())
+    wanted = {get_check(name).name for name in names}
+    return [check for check in CHECKS.values() if check.name in wanted]
+
+
+def job_config(names=None):
+    """Everything besides the data that determines the LLM results of a run, used to key job journals."""
+    prompts = [task.system_prompt for task, *_ in MESSAGE_CHECKS.values()] + [GENDER_TASK.system_prompt]
+    return {
+        "checks": [check.name for check in select_checks(names)],
+        "model": DEFAULT_MODEL,
+        "prompts": hashlib.sha256("\n".join(prompts).encode("utf-8")).hexdigest(),
+    }
+
+
+def run_checks(df, names=None, client=None, workers=1, journal=None, count_rows=True):
+    """Runs the selected checks on df and returns it with their flag columns added.
+
+    When more than one per-message LLM check is selected they share a single
+    combined request per message (see checks.multitask). With workers > 1 the
+    local (non-LLM) checks are sharded across a process pool (see checks.parallel).
+    With a journal (see checks.journal) LLM checks run in row blocks that are
+    recorded as they finish, and blocks recorded by an earlier attempt are reused.
+    Wall time per check is recorded in the current run metrics (see checks.metrics);
+    count_rows=False leaves df out of the run's row count, for a pass over rows
+    another pass already counts.
+    """
+    metrics = get_metrics()
+    if count_rows:
+        metrics.record_rows(len(df))
+    checks = select_checks(names)
+    local_results = {}
+    if workers > 1:
+        from checks.parallel import run_local_checks
+        start = time.perf_counter()
+        local_results = run_local_checks(df, checks, workers=workers)
+        if local_results:
+            metrics.record_check("local checks (parallel)", time.perf_counter() - start, len(df))
+
+    def run_llm(name, func):
+        start = time.perf_counter()
+        if journal is None:
+            result = func(df)
+        else:
+            from checks.journal import run_journaled
+            result = run_journaled(journal, name, df, func)
+        metrics.record_check(name, time.perf_counter() - start, len(df))
+        return result
+
+    message_checks = [check for check in checks if check.message_task]
+    combined = len(message_checks) > 1
+    if combined:
+        keys = [check.message_task for check in message_checks]
+        flags = run_llm("+".join(keys), lambda frame: evaluate_messages(frame['customer_message'], keys, client=client))
+        for column in flags.columns:
+            df[column] = flags[column]
+
+    for check in checks:
+        if combined and check.message_task:
+            continue
+        if check.name in local_results:
+            result = local_results[check.name]
+        elif check.uses_llm:
+            result = run_llm(check.name, check.func)
+        else:
+            start = time.perf_counter()
+            result = check.func(df)
+            metrics.record_check(check.name, time.perf_counter() - start, len(df))
+        for column in result.columns:
+            df[column] = result[column]
+    return df
@@ -0,0 +1,55 @@
+import os
+
+import pandas as pd
+
+from checks.pipeline import run_checks, select_checks
+
+# The first block is small so results show up within seconds; later blocks double up to the maximum
+DEFAULT_FIRST_BLOCK_ROWS = int(os.getenv("EVADENCE_FIRST_BLOCK_ROWS", "50"))
+DEFAULT_MAX_BLOCK_ROWS = int(os.getenv("EVADENCE_MAX_BLOCK_ROWS", "5000"))
+
+
+def growing_blocks(total, first_rows=DEFAULT_FIRST_BLOCK_ROWS, max_rows=DEFAULT_MAX_BLOCK_ROWS):
+    """Yields (start, stop) row ranges covering total rows, doubling in size from first_rows up to max_rows."""
+    start, size = 0, max(1, first_rows)
+    while start < total:
+        yield start, min(start + size, total)
+        start += size
+        size = min(size * 2, max(max_rows, first_rows))
+
+
+def run_in_blocks(df, names=None, on_block=None, first_rows=DEFAULT_FIRST_BLOCK_ROWS,
+                  max_rows=DEFAULT_MAX_BLOCK_ROWS, **kwargs):
+    """Runs the selected checks on df in growing row blocks and returns df with their columns added.
+
+    Cross-row checks run over the whole frame first, as they need every row;
+    row-wise checks then run block by block and on_block(block) is called with
+    each evaluated block, so callers can show partial results long before the
+    last row is done. The columns match those of run_checks(df, names).
+    kwargs are passed on to run_checks.
+    """
+    checks = select_checks(names)
+    cross_row = [check.name for check in checks if check.cross_row]
+    row_wise = [check.name for check in checks if not check.cross_row]
+    if not len(df):
+        return run_checks(df, names, **kwargs)
+
+    if cross_row:
+        # The blocks below count these rows, so they are only counted here when there are no blocks
+        run_checks(df, cross_row, count_rows=not row_wise, **kwargs)
+    if not row_wise:
+        if on_block is not None:
+            on_block(df)
+        return df
+
+    blocks = []
+    for start, stop in growing_blocks(len(df), first_rows, max_rows):
+        block = run_checks(df.iloc[start:stop].copy(), row_wise, **kwargs)
+        blocks.append(block)
+        if on_block is not None:
+            on_block(block)
+
+    evaluated = pd.concat(blocks)
+    for column in [column for column in evaluated.columns if column not in df.columns]:
+        df[column] = evaluated[column]
+    return df
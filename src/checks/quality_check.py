@@ -1,94 +1,109 @@
-import os
 import re
-import time
 import pandas as pd
-from cerebras.cloud.sdk import Cerebras, InternalServerError
-from dotenv import load_dotenv
+from checks.inference import chat
+from checks.batching import BatchTask, classify_column
+from checks.lexicon import get_lexicon
+from checks.registry import register
+from checks.near_duplicates import find_near_duplicates
 import logging
 
-# Initialize logging
-logging.basicConfig(level=logging.INFO)
+# 1. Relevance Check with Cerebras Inference
+RELEVANCE_PROMPT = (
+    "You are a classifier for customer support messages. "
+    "Classify a customer message as 'relevant' if it includes inquiries about orders, complaints, product questions, cancellations, or account support. "
+    "If the message is unrelated to customer support, random, or contains sensitive information without a request for support, classify it as 'irrelevant'."
+)
 
-# Load environment variables from .env file
-load_dotenv()
-api_key = os.getenv("CEREBRAS_API_KEY")
-if not api_key:
-    raise ValueError("API Key not found. Please set the CEREBRAS_API_KEY in your .env file.")
+# Lexicon categories (see checks.lexicon) that make a message irrelevant whatever the model says
+IRRELEVANT_CATEGORIES = ["sensitive", "irrelevant"]
 
-# Initialize the Cerebras client with the loaded API key
-client = Cerebras(api_key=api_key)
+def relevance_rule(message):
+    """Cheap first tier: messages with sensitive or filler phrases are irrelevant whatever the model says."""
+    lexicon = get_lexicon()
+    if lexicon.mask(message) & lexicon.category_mask(IRRELEVANT_CATEGORIES):
+        return False
+    return None
 
-# Load the CSV file
-df = pd.read_csv("../data/flawed_dataset.csv")
+def parse_relevance(content, message):
+    """Turns the model's answer for a message into the relevance flag."""
+    content = content.strip().lower()
+    # "irrelevant" contains "relevant", so it has to be tested first
+    is_relevant = "irrelevant" not in content and "relevant" in content
+    local = relevance_rule(message)
+    return is_relevant if local is None else local
 
-# 1. Relevance Check with Cerebras Inference
 def check_relevance(message):
-    """Determines if a message is relevant for customer support purposes using Cerebras API."""
-    retries = 3
-    for attempt in range(retries):
-        try:
-            response = client.chat.completions.create(
-                messages=[{
-                    "role": "system",
-                    "content": (
-                        "You are a classifier for customer support messages. "
-                        "Classify a customer message as 'relevant' if it includes inquiries about orders, complaints, product questions, cancellations, or account support. "
-                        "If the message is unrelated to customer support, random, or contains sensitive information without a request for support, classify it as 'irrelevant'."
-                    )
-                }, {"role": "user", "content": message}],
-                model="llama3.1-8b",
-                max_completion_tokens=50,
-                temperature=0.2
-            )
-            content = response.choices[0].message.content.strip()
-            is_relevant = "relevant" in content.lower()
-
-            # Additional checks for sensitive and irrelevant content
-            sensitive_terms = ["ssn", "social security", "phone number", "email"]
-            irrelevant_phrases = ["random", "no purpose", "unrelated", "placeholder"]
-
-            if any(term in message.lower() for term in sensitive_terms):
-                return False
-            if any(phrase in message.lower() for phrase in irrelevant_phrases):
-                return False
-
-            return is_relevant
-        except InternalServerError:
-            if attempt < retries - 1:
-                logging.warning(f"Attempt {attempt + 1} failed. Retrying...")
-                time.sleep(2)
-            else:
-                logging.error(f"Failed to process message after {retries} attempts: {message}")
-                return None
+    """Determines if a message is relevant for customer support purposes using Cerebras API.
+
+    Transient API errors are retried by checks.inference; errors that remain
+    propagate, and checks.batching then leaves the row undetermined.
+    """
+    local = relevance_rule(message)
+    if local is not None:
+        return local
+    content = chat(RELEVANCE_PROMPT, message, max_completion_tokens=50)
+    return parse_relevance(content, message)
+
+RELEVANCE_TASK = BatchTask("relevance", RELEVANCE_PROMPT, parse_relevance, check_relevance, 50, precheck=relevance_rule)
 
 def check_relevance_with_delay(message):
-    """Wrapper to add delay between relevance checks to avoid rate limits."""
-    time.sleep(0.2)  # Adjust as needed based on rate limits
+    """Kept for compatibility; rate limiting is now done by the shared token bucket in checks.inference."""
     return check_relevance(message)
 
-df['relevance_flag'] = df['customer_message'].apply(
-    lambda msg: check_relevance_with_delay(msg) if pd.notnull(msg) else None
-)
+@register("relevance", ["relevance_flag", "relevance_decided_by"], uses_llm=True, message_task="relevance",
+          description="Customer-support relevance of each message")
+def relevance_flags(df):
+    flags, tiers = classify_column(df['customer_message'], RELEVANCE_TASK, default=None, with_tiers=True)
+    return pd.DataFrame({'relevance_flag': flags, 'relevance_decided_by': tiers})
 
 # 2. Duplicate Detection
-df['duplicate_flag'] = df.duplicated(subset=['customer_message'], keep=False)
+def hash_messages(series):
+    """64-bit hashes of the values in series; missing values all share one hash, as in df.duplicated."""
+    return pd.util.hash_pandas_object(series.fillna("\x00").astype(str), index=False).to_numpy()
+
+@register("duplicates", ["duplicate_flag"], cross_row=True, description="Exact duplicate messages")
+def duplicate_flags(df):
+    return pd.DataFrame({'duplicate_flag': df.duplicated(subset=['customer_message'], keep=False)})
+
+@register("near_duplicates", ["near_duplicate_flag", "near_duplicate_cluster"], cross_row=True,
+          description="Near-duplicate messages (MinHash/LSH)")
+def near_duplicate_flags(df):
+    clusters = find_near_duplicates(df['customer_message'])
+    return pd.DataFrame({'near_duplicate_flag': clusters >= 0, 'near_duplicate_cluster': clusters}, index=df.index)
 
 # 3. Completeness Check for Essential Fields
-df['missing_message'] = df['customer_message'].isnull()
-df['missing_name'] = df['name'].isnull()
+@register("completeness", ["missing_message", "missing_name"], description="Missing messages and names")
+def completeness_flags(df):
+    return pd.DataFrame({
+        'missing_message': df['customer_message'].isnull(),
+        'missing_name': df['name'].isnull(),
+    })
 
 # 4. Language Quality Check
+POOR_QUALITY_PATTERN = re.compile(r'[^A-Za-z0-9\s.,!?\'"-]{3,}|^\W+|\W+$|[A-Za-z]{1}\s+[A-Za-z]{1}')
+
 def detect_language_quality(text):
     """Checks for poor language quality, such as incomplete sentences or excessive special characters."""
     if pd.isnull(text):
         return False
-    poor_quality_pattern = r'[^A-Za-z0-9\s.,!?\'"-]{3,}|^\W+|\W+$|[A-Za-z]{1}\s+[A-Za-z]{1}'
-    return bool(re.search(poor_quality_pattern, text))
+    return bool(POOR_QUALITY_PATTERN.search(text))
+
+@register("language_quality", ["language_quality_flag"], description="Poor language quality")
+def language_quality_flags(df):
+    return pd.DataFrame({'language_quality_flag': df['customer_message'].str.contains(POOR_QUALITY_PATTERN, na=False)})
+
+if __name__ == "__main__":
+    from checks.pipeline import run_checks
+
+    # Initialize logging
+    logging.basicConfig(level=logging.INFO)
 
-df['language_quality_flag'] = df['customer_message'].apply(detect_language_quality)
+    # Load the CSV file
+    df = pd.read_csv("../data/flawed_dataset.csv")
+    df = run_checks(df, ["relevance", "duplicates", "completeness", "language_quality"])
 
-# Save results to a new CSV file
-df.to_csv("../data/evaluated_dataset.csv", index=False)
+    # Save results to a new CSV file
+    df.to_csv("../data/evaluated_dataset.csv", index=False)
 
-# Display the DataFrame with all quality flags
-print(df[['customer_message', 'relevance_flag', 'duplicate_flag', 'missing_message', 'missing_name', 'language_quality_flag']])
+    # Display the DataFrame with all quality flags
+    print(df[['customer_message', 'relevance_flag', 'duplicate_flag', 'missing_message', 'missing_name', 'language_quality_flag']])
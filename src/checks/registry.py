@@ -0,0 +1,25 @@
+from collections import namedtuple
+
+# A registered check adds `columns` to a DataFrame.
+#   func(df) returns a DataFrame (aligned with df.index) holding those columns.
+#   uses_llm marks checks that call the inference API.
+#   message_task names the key used by checks.multitask when several per-message LLM checks are combined.
+#   cross_row marks checks whose result for a row depends on other rows, so they cannot run per shard.
+Check = namedtuple("Check", ["name", "func", "columns", "uses_llm", "message_task", "cross_row", "description"])
+
+CHECKS = {}
+
+
+def register(name, columns, uses_llm=False, message_task=None, cross_row=False, description=""):
+    """Decorator adding a check function to the registry under `name`."""
+    def decorator(func):
+        CHECKS[name] = Check(name, func, tuple(columns), uses_llm, message_task, cross_row, description)
+        return func
+    return decorator
+
+
+def get_check(name):
+    try:
+        return CHECKS[name]
+    except KeyError:
+        raise ValueError(f"Unknown check '{name}'. Available checks: {', '.join(CHECKS)}") from None
@@ -0,0 +1,182 @@
+import email.utils
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+# Attempts per completion, and the exponential backoff between them (full jitter, capped)
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("CEREBRAS_MAX_ATTEMPTS", "4"))
+DEFAULT_BACKOFF_SECONDS = float(os.getenv("CEREBRAS_BACKOFF_SECONDS", "0.5"))
+DEFAULT_MAX_BACKOFF_SECONDS = float(os.getenv("CEREBRAS_MAX_BACKOFF_SECONDS", "30"))
+
+# Consecutive failed requests that open the circuit, and how long it stays open before a probe request
+DEFAULT_BREAKER_FAILURES = int(os.getenv("CEREBRAS_BREAKER_FAILURES", "10"))
+DEFAULT_BREAKER_RESET_SECONDS = float(os.getenv("CEREBRAS_BREAKER_RESET_SECONDS", "30"))
+
+# Status codes worth retrying: timeout, conflict, rate limit and server errors
+RETRYABLE_STATUS = {408, 409, 429}
+
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class CircuitOpen(Exception):
+    """Raised instead of sending a request while the endpoint is considered down."""
+
+
+def unavailable_errors():
+    """Errors after which a row is left undetermined rather than failing the run.
+
+    The SDK is imported here rather than at module level, so importing the
+    checks stays free of side effects (see checks.client.get_client).
+    """
+    from cerebras.cloud.sdk import APIError
+
+    return APIError, CircuitOpen
+
+
+def is_retryable(error):
+    """True for errors a later attempt may not hit: connection problems, timeouts, rate limits and 5xx."""
+    from cerebras.cloud.sdk import APIConnectionError, APIStatusError
+
+    if isinstance(error, APIConnectionError):  # includes APITimeoutError
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    return False
+
+
+def backoff_window(attempt, base=DEFAULT_BACKOFF_SECONDS, cap=DEFAULT_MAX_BACKOFF_SECONDS):
+    """Longest backoff before retry number attempt + 1: base * 2**attempt, capped."""
+    return min(cap, base * 2 ** attempt)
+
+
+def backoff_delay(attempt, base=DEFAULT_BACKOFF_SECONDS, cap=DEFAULT_MAX_BACKOFF_SECONDS):
+    """Seconds to wait before retry number attempt + 1: uniform between 0 and base * 2**attempt, capped.
+
+    The jitter spreads out the retries of requests that failed together, so
+    they do not hit the API again in lockstep.
+    """
+    return random.uniform(0, backoff_window(attempt, base, cap))
+
+
+def retry_after_delay(requested, attempt):
+    """Seconds to wait before retry number attempt + 1 when the API asked for requested: that plus a backoff.
+
+    Every request rejected by the same exhausted quota is told the same wait;
+    without the jitter on top they would all retry at the same instant and
+    exhaust it again.
+    """
+    return requested + backoff_delay(attempt)
+
+
+def parse_duration(value):
+    """Seconds in a header value such as '2', '1.5', '250ms' or '1m30s'; None if it is not a duration."""
+    value = str(value).strip().lower()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_PART.findall(value)
+    if not parts or "".join(number + unit for number, unit in parts) != value:
+        return None
+    return sum(float(number) * DURATION_UNITS[unit] for number, unit in parts)
+
+
+def retry_after_seconds(error):
+    """How long the API asked us to wait, from the headers of a failed response, or None.
+
+    Uses retry-after-ms or retry-after (seconds or an HTTP date) when present,
+    and otherwise the longest x-ratelimit-reset-* of every exhausted
+    x-ratelimit-remaining-* quota.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    if "retry-after-ms" in headers:
+        seconds = parse_duration(headers["retry-after-ms"])
+        if seconds is not None:
+            return seconds / 1000
+    if "retry-after" in headers:
+        seconds = parse_duration(headers["retry-after"])
+        if seconds is None:
+            try:
+                seconds = email.utils.parsedate_to_datetime(headers["retry-after"]).timestamp() - time.time()
+            except (TypeError, ValueError):
+                seconds = None
+        if seconds is not None:
+            return max(seconds, 0.0)
+
+    waits = []
+    for name, value in headers.items():
+        name = name.lower()
+        if name.startswith("x-ratelimit-remaining-") and parse_duration(value) == 0:
+            reset = headers.get("x-ratelimit-reset-" + name[len("x-ratelimit-remaining-"):])
+            seconds = parse_duration(reset) if reset is not None else None
+            if seconds is not None:
+                waits.append(seconds)
+    return max(waits) if waits else None
+
+
+class CircuitBreaker:
+    """Fails requests fast once the endpoint looks down, instead of letting every row wait out its retries.
+
+    After failure_threshold consecutive failures the circuit opens and allow()
+    raises CircuitOpen. After reset_seconds one probe request is let through:
+    success closes the circuit, failure opens it again. A probe that ends
+    without an answer either way (cancelled, or an error that says nothing
+    about the endpoint) must be given back with release().
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_BREAKER_FAILURES, reset_seconds=DEFAULT_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            return "half-open" if self._probing or time.monotonic() - self.opened_at >= self.reset_seconds else "open"
+
+    def allow(self):
+        """Raises CircuitOpen unless a request may be sent now; returns True if that request is the probe."""
+        if self.failure_threshold <= 0:
+            return False
+        with self._lock:
+            if self.opened_at is None:
+                return False
+            if not self._probing and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self._probing = True
+                return True
+        raise CircuitOpen("The inference API is unavailable; skipping requests until it recovers")
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                logging.info("Inference API recovered; circuit closed.")
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def release(self):
+        """Frees the probe slot without changing the state, so the next request probes instead."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or (self.opened_at is None and 0 < self.failure_threshold <= self.failures):
+                if self.opened_at is None:
+                    logging.warning(f"{self.failures} consecutive inference failures; circuit opened for "
+                                    f"{self.reset_seconds:g} s.")
+                self.opened_at = time.monotonic()
+                self._probing = False
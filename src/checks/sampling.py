@@ -0,0 +1,219 @@
+import logging
+import math
+import os
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from checks.batching import TIER_UNDETERMINED
+
+# Default half-width of the confidence intervals, and their confidence level
+DEFAULT_MARGIN = float(os.getenv("EVADENCE_SAMPLE_MARGIN", "0.05"))
+DEFAULT_CONFIDENCE = float(os.getenv("EVADENCE_SAMPLE_CONFIDENCE", "0.95"))
+
+# Column stratified on when present; otherwise rows are stratified by message length
+DEFAULT_STRATA_COLUMN = "customer_intent"
+LENGTH_STRATA = 4
+
+# Each round grows the sample by at least this factor, so a run needs only a few rounds
+MIN_GROWTH = 1.5
+
+# Rates estimated from a sample: (name, check, column, value counted)
+ESTIMATES = [
+    ("relevance_rate", "relevance", "relevance_flag", True),
+    ("language_bias_rate", "language_bias", "language_bias_flag", True),
+    ("gender_male_share", "gender_bias", "gender_bias_flag", "male"),
+    ("gender_female_share", "gender_bias", "gender_bias_flag", "female"),
+    ("gender_unknown_share", "gender_bias", "gender_bias_flag", "unknown"),
+]
+SAMPLED_CHECKS = list(dict.fromkeys(check for _, check, _, _ in ESTIMATES))
+
+# Column each sampled check reads
+INPUT_COLUMNS = {"relevance": "customer_message", "language_bias": "customer_message", "gender_bias": "name"}
+
+# Checks whose rates leave out the rows missing their input, as the full-run report's relevant/irrelevant split does.
+# The other checks give such rows their default label (not biased, "unknown" gender), which the full-run report
+# counts over all rows, so their rates do too.
+INPUT_REQUIRED = {"relevance"}
+
+
+def z_score(confidence):
+    """Two-sided standard normal quantile for a confidence level, e.g. 1.96 for 0.95."""
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+
+def wilson_interval(p, n, confidence=DEFAULT_CONFIDENCE):
+    """Wilson score interval (low, high) for a proportion p observed on n rows.
+
+    Unlike p ± z·sqrt(p(1-p)/n) it stays inside [0, 1] and does not collapse
+    to a point when p is 0 or 1, so rare flags still get an honest upper bound.
+    """
+    if n <= 0:
+        return 0.0, 1.0
+    z2 = z_score(confidence) ** 2
+    center = (p + z2 / (2 * n)) / (1 + z2 / n)
+    half = math.sqrt(p * (1 - p) / n + z2 / (4 * n * n)) * math.sqrt(z2) / (1 + z2 / n)
+    return max(center - half, 0.0), min(center + half, 1.0)
+
+
+def required_sample_size(margin=DEFAULT_MARGIN, confidence=DEFAULT_CONFIDENCE, population=None, p=0.5):
+    """Rows needed to estimate a proportion near p to within ±margin.
+
+    p = 0.5 is the worst case. With a population size the finite population
+    correction is applied, so small files are never oversampled.
+    """
+    n = z_score(confidence) ** 2 * max(p * (1 - p), 0.01) / margin ** 2
+    if population is not None:
+        n = n / (1 + (n - 1) / population) if population else 0
+    return math.ceil(n)
+
+
+def strata_labels(df, column=DEFAULT_STRATA_COLUMN):
+    """Stratum of each row: the value of column, or the message-length quartile when df has no such column."""
+    if column in df.columns:
+        return df[column].fillna("(missing)").astype(str)
+    lengths = df['customer_message'].fillna("").astype(str).str.len()
+    return pd.qcut(lengths.rank(method="first"), min(LENGTH_STRATA, max(len(df), 1)), labels=False).astype(str)
+
+
+def read_sample_frame(source, strata=DEFAULT_STRATA_COLUMN):
+    """Reads only the columns the sampled checks and the strata need, so files too large to load whole can be sampled."""
+    return pd.read_csv(source, usecols=lambda column: column in {*INPUT_COLUMNS.values(), strata})
+
+
+class StratifiedSample:
+    """Nested stratified random samples of a frame's rows, for growing a sample round by round.
+
+    Every stratum's rows are shuffled once, and a sample of n rows takes the
+    first rows of each stratum in proportion to its size (at least one per
+    stratum while n allows). A larger sample therefore contains every smaller
+    one, and only the new rows need evaluating.
+    """
+
+    def __init__(self, strata, seed=0):
+        rng = np.random.default_rng(seed)
+        self.population = len(strata)
+        self.orders = {label: rng.permutation(index.to_numpy())
+                       for label, index in strata.groupby(strata, sort=True).groups.items()}
+        self.sizes = {label: len(order) for label, order in self.orders.items()}
+
+    def allocation(self, n):
+        """Rows per stratum for a sample of n: proportional allocation, remainders to the largest fractions."""
+        n = min(n, self.population)
+        quotas = {label: n * size / self.population for label, size in self.sizes.items()}
+        counts = {label: min(int(quota), self.sizes[label]) for label, quota in quotas.items()}
+        if n >= len(self.sizes):
+            counts = {label: max(count, 1) for label, count in counts.items()}
+        for label in sorted(quotas, key=lambda label: counts[label] - quotas[label]):
+            if sum(counts.values()) >= n:
+                break
+            if counts[label] < self.sizes[label]:
+                counts[label] += 1
+        return counts
+
+    def rows(self, counts):
+        return {label: self.orders[label][:count] for label, count in counts.items()}
+
+
+def stratified_estimate(sample, values, determined, sizes, population, confidence=DEFAULT_CONFIDENCE):
+    """Estimate of a proportion from a stratified sample, with its confidence interval.
+
+    sample maps each stratum to its sampled row labels, values and determined
+    are boolean Series over those rows, and sizes holds the number of rows
+    of each stratum in the population. Rows left undetermined by the API
+    are treated as missing at random within their stratum. The interval is
+    the Wilson interval at the effective sample size p(1-p)/variance of the
+    stratified estimator, which includes the finite population correction.
+    """
+    estimate = variance = 0.0
+    used = weight = 0
+    for label, rows in sample.items():
+        rows = rows[determined.loc[rows].to_numpy()]
+        n_h, size = len(rows), sizes[label]
+        if not n_h:
+            continue
+        p_h = float(values.loc[rows].mean())
+        estimate += size * p_h
+        weight += size
+        used += n_h
+        variance += size ** 2 * (1 - n_h / size) * p_h * (1 - p_h) / max(n_h - 1, 1)
+    if not used:
+        return {"estimate": None, "low": None, "high": None, "sample": 0, "population": population}
+    # Strata without a single determined row are left out of the weights
+    estimate /= weight
+    variance /= weight ** 2
+    if used >= weight:
+        low = high = estimate
+    else:
+        # Every stratum all-or-nothing leaves no sampling variance to go on; fall back to the plain sample size
+        effective = estimate * (1 - estimate) / variance if variance > 0 else used
+        low, high = wilson_interval(estimate, effective, confidence)
+    return {"estimate": estimate, "low": low, "high": high, "sample": used, "population": population}
+
+
+def estimate_rates(df, names=None, margin=DEFAULT_MARGIN, confidence=DEFAULT_CONFIDENCE, strata=DEFAULT_STRATA_COLUMN,
+                   seed=0, client=None, max_rows=None):
+    """Estimates the rates of the LLM-based checks in names from a stratified random sample of df.
+
+    Runs the checks (see checks.pipeline.run_checks) on a pilot sample only,
+    then grows the sample towards the size the observed rates need (see
+    required_sample_size) until every interval is at most margin wide on
+    either side, or the whole frame (or max_rows) is used.
+    Returns {name: {"estimate", "low", "high", "sample", "population",
+    "confidence"}} for every rate in ESTIMATES whose check is in names.
+    """
+    from checks.pipeline import run_checks
+
+    names = [name for name in (SAMPLED_CHECKS if names is None else names) if name in SAMPLED_CHECKS]
+    wanted = [estimate for estimate in ESTIMATES if estimate[1] in names]
+    if not wanted or not len(df):
+        return {}
+    population = len(df)
+    limit = min(population, max_rows or population)
+    labels = strata_labels(df, strata)
+    sampler = StratifiedSample(labels, seed=seed)
+    # Rows without a required input are sampled along with the rest but belong to no stratum of the check's rates
+    present = {check: df[INPUT_COLUMNS[check]].notna() if check in INPUT_REQUIRED else pd.Series(True, index=df.index)
+               for check in names}
+    sizes = {check: {label: int(count) for label, count in present[check].groupby(labels).sum().items()}
+             for check in names}
+    # The first round is a pilot sized for twice the margin: rates far from 0.5 need far fewer rows than the worst case
+    n = min(required_sample_size(2 * margin, confidence, population), limit)
+    evaluated = []
+    done = {}
+    while True:
+        # Rounding may hand a stratum one row less than last round; rows already evaluated are kept
+        counts = sampler.allocation(n)
+        sample = sampler.rows({label: max(count, done.get(label, 0)) for label, count in counts.items()})
+        new = [row for label, rows in sample.items() for row in rows[done.get(label, 0):]]
+        if new:
+            # These rows are already part of the run's row count, if a full run counted them
+            evaluated.append(run_checks(df.loc[new].copy(), names, client=client, count_rows=False))
+        done = {label: len(rows) for label, rows in sample.items()}
+        results = pd.concat(evaluated)
+
+        estimates = {}
+        for name, check, column, value in wanted:
+            # A null tier marks a missing input, which the checks never classify but leave at their default label
+            tiers = results[f"{check}_decided_by"].astype(object)
+            determined = tiers != TIER_UNDETERMINED
+            if check in INPUT_REQUIRED:
+                determined &= tiers.notna()
+            values = results[column].astype(object).eq(value)
+            estimates[name] = stratified_estimate(sample, values, determined, sizes[check],
+                                                  int(present[check].sum()), confidence)
+            estimates[name]["confidence"] = confidence
+
+        sampled = sum(done.values())
+        widths = [max(entry["high"] - entry["estimate"], entry["estimate"] - entry["low"])
+                  for entry in estimates.values() if entry["estimate"] is not None]
+        logging.info(f"Sampled {sampled} of {population} rows; widest interval ±{max(widths, default=1.0):.1%}.")
+        # Without a single determined row (API unavailable) a larger sample would not help
+        if not widths or max(widths) <= margin or sampled >= limit:
+            return estimates
+
+        # Size the next round for the observed rate closest to 0.5, the one needing the most rows
+        p = min((entry["estimate"] for entry in estimates.values() if entry["estimate"] is not None),
+                key=lambda rate: abs(rate - 0.5), default=0.5)
+        n = min(max(required_sample_size(margin, confidence, population, p), math.ceil(sampled * MIN_GROWTH)), limit)
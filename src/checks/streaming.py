@@ -0,0 +1,127 @@
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from checks.flags import any_flag
+from checks.metrics import get_metrics
+from checks.pipeline import run_checks, select_checks
+from checks.quality_check import hash_messages
+from report_generator import RowResultWriter, merge_summaries, summarize
+
+DEFAULT_CHUNKSIZE = int(os.getenv("EVADENCE_CHUNKSIZE", "50000"))
+
+# Hash buckets spilled to disk while looking for duplicates; one bucket is in memory at a time
+DUPLICATE_BUCKETS = 64
+
+# Columns that mark a row as flagged when True (relevance_flag is flagged when False)
+ISSUE_COLUMNS = [
+    'duplicate_flag', 'missing_message', 'missing_name', 'language_quality_flag',
+    'email_flag', 'ssn_flag', 'phone_flag', 'pii_flag_inference', 'language_bias_flag',
+]
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def find_duplicate_hashes(source, column="customer_message", chunksize=DEFAULT_CHUNKSIZE, buckets=DUPLICATE_BUCKETS):
+    """Returns the sorted hashes of values that occur more than once anywhere in the CSV.
+
+    Hashes are partitioned into bucket files on disk, so only one bucket is
+    loaded at a time instead of every message in the file.
+    """
+    _rewind(source)
+    duplicates = []
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, f"{i}.bin") for i in range(buckets)]
+        files = [open(path, "wb") for path in paths]
+        try:
+            for chunk in pd.read_csv(source, usecols=[column], chunksize=chunksize):
+                hashes = hash_messages(chunk[column])
+                bucket = hashes % np.uint64(buckets)
+                for i in np.unique(bucket):
+                    files[i].write(hashes[bucket == i].tobytes())
+        finally:
+            for file in files:
+                file.close()
+
+        for path in paths:
+            values, counts = np.unique(np.fromfile(path, dtype=np.uint64), return_counts=True)
+            duplicates.append(values[counts > 1])
+    return np.sort(np.concatenate(duplicates))
+
+
+def issue_mask(df):
+    """True for rows with at least one detected issue; one AND over the bitmask of a packed frame."""
+    return any_flag(df, [*ISSUE_COLUMNS, 'relevance_flag'])
+
+
+def read_chunks(source, chunksize=DEFAULT_CHUNKSIZE, first_chunksize=None):
+    """Reads a CSV in chunks; with first_chunksize, chunks start that small and double up to chunksize."""
+    reader = pd.read_csv(source, iterator=True)
+    size = first_chunksize or chunksize
+    while True:
+        try:
+            yield reader.get_chunk(size)
+        except StopIteration:
+            return
+        size = min(size * 2, chunksize)
+
+
+def stream_checks(source, names=None, chunksize=DEFAULT_CHUNKSIZE, output_path=None, flagged_path=None, on_chunk=None,
+                  workers=1, journal=None, first_chunksize=None, results_path=None):
+    """Runs the selected checks over a CSV chunk by chunk and returns the report summary.
+
+    Memory is bounded by the chunk size: evaluated rows are appended to
+    output_path, rows with any issue to flagged_path, and only the aggregate
+    summary is kept. results_path receives only the check columns of every
+    row in a compressed columnar format (see RowResultWriter). duplicate_flag is computed across the whole file.
+    on_chunk(chunk, summary) is called after each chunk with the running summary;
+    a small first_chunksize makes the first call come quickly on large files.
+    workers and journal are passed on to run_checks for each chunk.
+    """
+    checks = select_checks(names)
+    # Only exact duplicates have a whole-file implementation; other cross-row checks would be chunk-local
+    skipped = [check.name for check in checks if check.cross_row and check.name != "duplicates"]
+    if skipped:
+        logging.warning(f"Skipping {', '.join(skipped)} in streaming mode; run them on the full file instead.")
+    names = [check.name for check in checks if check.name not in skipped]
+    duplicate_hashes = None
+    if "duplicates" in names:
+        start = time.perf_counter()
+        duplicate_hashes = find_duplicate_hashes(source, chunksize=chunksize)
+        get_metrics().record_check("duplicates", time.perf_counter() - start, 0)
+    chunk_names = [name for name in names if name != "duplicates"]
+
+    _rewind(source)
+    summary = None
+    first = True
+    results = RowResultWriter(results_path) if results_path else None
+    try:
+        for chunk in read_chunks(source, chunksize, first_chunksize):
+            chunk = run_checks(chunk, chunk_names, workers=workers, journal=journal)
+            if duplicate_hashes is not None:
+                start = time.perf_counter()
+                chunk['duplicate_flag'] = np.isin(hash_messages(chunk['customer_message']), duplicate_hashes)
+                get_metrics().record_check("duplicates", time.perf_counter() - start, len(chunk))
+
+            if output_path:
+                chunk.to_csv(output_path, mode="w" if first else "a", header=first, index=False)
+            if flagged_path:
+                chunk[issue_mask(chunk)].to_csv(flagged_path, mode="w" if first else "a", header=first, index=False)
+            if results is not None:
+                results.write(chunk)
+            first = False
+
+            summary = merge_summaries(summary, summarize(chunk))
+            if on_chunk is not None:
+                on_chunk(chunk, summary)
+    finally:
+        if results is not None:
+            results.close()
+    return summary if summary is not None else summarize(pd.DataFrame())
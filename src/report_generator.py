@@ -1,6 +1,237 @@
+import gzip
+import json
+
+import numpy as np
 import pandas as pd
 
-def generate_report(df, output_path="../data/report.txt"):
+from checks.flags import FLAGS_COLUMN, LABEL_COLUMNS, any_flag, count_flags, flag_values, has_flag, unpack_flags
+from checks.lexicon import NO_MATCH
+from checks.pii import CORE_PII_TYPES, PII_LABELS, PII_PATTERNS
+
+# Regex PII flag columns; the types beyond email, SSN and phone get their own report lines when present
+PII_FLAG_COLUMNS = [f"{kind}_flag" for kind in PII_PATTERNS]
+EXTRA_PII_TYPES = [kind for kind in PII_PATTERNS if kind not in CORE_PII_TYPES]
+
+# Boolean flag columns whose True count is reported
+FLAG_COLUMNS = [
+    'duplicate_flag', 'near_duplicate_flag', 'missing_message', 'missing_name', 'language_quality_flag',
+    *PII_FLAG_COLUMNS, 'pii_flag_inference', 'language_bias_flag',
+]
+
+def summarize(df):
+    """Reduces an evaluated DataFrame to the counts the report needs.
+
+    Every flag column is counted in one pass over a boolean matrix, or over
+    the bitmask of a packed frame (see checks.flags); label columns are
+    counted with one value_counts each. Absent checks are recorded as None.
+    Summaries of separate chunks can be combined with merge_summaries, so the
+    report never needs the full frame.
+    """
+    summary = {'total_entries': len(df)}
+    present = [column for column in FLAG_COLUMNS if column in df.columns]
+    matrix = df[present].to_numpy(dtype=bool, na_value=False) if present else np.zeros((len(df), 0), dtype=bool)
+    counts = dict(zip(present, matrix.sum(axis=0).tolist()))
+    if FLAGS_COLUMN in df.columns:
+        counts.update(count_flags(df))
+    for column in FLAG_COLUMNS:
+        summary[column] = counts.get(column)
+
+    # Rows with at least one regex PII match, unlike the per-type totals
+    pii = [column for column in PII_FLAG_COLUMNS if column in counts]
+    summary['any_pii'] = int(any_flag(df, pii).sum()) if pii else None
+
+    if has_flag(df, 'relevance_flag'):
+        relevance_count = flag_values(df, 'relevance_flag').value_counts().to_dict()
+        summary['relevant'] = int(relevance_count.get(True, 0))
+        summary['irrelevant'] = int(relevance_count.get(False, 0))
+    else:
+        summary['relevant'] = summary['irrelevant'] = None
+
+    # Which cascade tier decided each LLM-backed check (see checks.batching)
+    tier_columns = [column for column in df.columns if column.endswith('_decided_by')]
+    if tier_columns:
+        tiers = {c[:-len('_decided_by')]: df[c].value_counts() for c in tier_columns}
+        summary['decided_by_rule'] = {check: int(counts.get('rule', 0)) for check, counts in tiers.items()}
+        summary['decided_by_llm'] = {check: int(counts.get('llm', 0)) for check, counts in tiers.items()}
+        summary['undetermined'] = {check: int(counts.get('undetermined', 0)) for check, counts in tiers.items()}
+    else:
+        summary['decided_by_rule'] = summary['decided_by_llm'] = summary['undetermined'] = None
+
+    if 'gender_bias_flag' in df.columns:
+        summary['gender_counts'] = {k: int(v) for k, v in df['gender_bias_flag'].value_counts().items() if v}
+    else:
+        summary['gender_counts'] = None
+
+    # Messages per lexicon category; a message matching several categories counts towards each
+    if 'lexicon_categories' in df.columns:
+        summary['lexicon_counts'] = {}
+        for label, count in df['lexicon_categories'].value_counts().items():
+            if count and label != NO_MATCH:
+                for category in label.split(", "):
+                    summary['lexicon_counts'][category] = summary['lexicon_counts'].get(category, 0) + int(count)
+    else:
+        summary['lexicon_counts'] = None
+    return summary
+
+def derive_metrics(summary):
+    """Totals, rates and bias metrics derived from a summary, shared by the text and JSON reports."""
+    total_entries = summary['total_entries']
+    pii_total_count = sum(summary[column] or 0 for column in PII_FLAG_COLUMNS)
+    derived = {
+        'pii_total': pii_total_count,
+        'quality_issues': sum(summary[key] or 0 for key in [
+            'irrelevant', 'duplicate_flag', 'missing_message', 'missing_name', 'language_quality_flag',
+        ]),
+        'compliance_issues': pii_total_count,
+        'language_bias_rate': None,
+        'gender_shares': None,
+        'gender_parity': None,
+    }
+    # Rates estimated from a sample (see checks.sampling) stand in for checks that did not run on every row
+    estimates = summary.get('estimates') or {}
+    if summary['language_bias_flag'] is not None and total_entries:
+        derived['language_bias_rate'] = summary['language_bias_flag'] / total_entries
+    elif estimates.get('language_bias_rate', {}).get('estimate') is not None:
+        derived['language_bias_rate'] = estimates['language_bias_rate']['estimate']
+
+    gender_counts = summary['gender_counts']
+    if gender_counts is not None:
+        assigned = sum(gender_counts.values())
+        derived['gender_shares'] = {gender: count / assigned for gender, count in gender_counts.items()} if assigned else {}
+        # Smaller over larger of the male and female counts: 1.0 is balanced, 0.0 one-sided
+        male, female = gender_counts.get('male', 0), gender_counts.get('female', 0)
+        derived['gender_parity'] = min(male, female) / max(male, female) if max(male, female) else None
+    elif any(name.startswith('gender_') for name in estimates):
+        derived['gender_shares'] = {name[len('gender_'):-len('_share')]: entry['estimate']
+                                    for name, entry in estimates.items()
+                                    if name.startswith('gender_') and entry['estimate'] is not None}
+        male, female = derived['gender_shares'].get('male', 0), derived['gender_shares'].get('female', 0)
+        derived['gender_parity'] = min(male, female) / max(male, female) if max(male, female) else None
+    return derived
+
+def format_estimate(entry):
+    """A sampled rate as '82.0% (95% CI 77.1%–86.1%, 250 of 1000 rows sampled)' (see checks.sampling)."""
+    if entry['estimate'] is None:
+        return f"Not determined ({entry['population']} rows, API unavailable)"
+    return (f"{entry['estimate']:.1%} ({entry['confidence']:.0%} CI {entry['low']:.1%}–{entry['high']:.1%}, "
+            f"{entry['sample']} of {entry['population']} rows sampled)")
+
+def merge_summaries(a, b):
+    """Adds two summaries produced by summarize."""
+    if a is None:
+        return b
+    merged = {}
+    for key in a.keys() | b.keys():
+        x, y = a.get(key), b.get(key)
+        if x is None or y is None:
+            merged[key] = y if x is None else x
+        elif isinstance(x, dict):
+            merged[key] = {k: x.get(k, 0) + y.get(k, 0) for k in x.keys() | y.keys()}
+        else:
+            merged[key] = x + y
+    return merged
+
+def generate_report(df, output_path="../data/report.txt", metrics=None, summary_path=None, estimates=None):
+    """Writes the text report (and optionally the JSON summary) of an evaluated frame.
+
+    estimates, from checks.sampling.estimate_rates, reports the rates of LLM
+    checks that ran on a sample instead of every row, with confidence intervals.
+    """
+    summary = summarize(df)
+    if estimates:
+        summary['estimates'] = estimates
+    write_report(summary, output_path=output_path, metrics=metrics)
+    if summary_path:
+        write_summary_json(summary, summary_path, metrics=metrics)
+
+def write_summary_json(summary, output_path, metrics=None):
+    """Writes the summary, its derived metrics and optional run metrics as machine-readable JSON."""
+    with open(output_path, "w") as file:
+        json.dump({'summary': summary, 'derived': derive_metrics(summary), 'performance': metrics}, file, indent=2)
+    print(f"Summary saved to {output_path}")
+
+def result_columns(df):
+    """The columns of df added by registered checks, in registry order."""
+    from checks.pipeline import select_checks
+
+    return [column for check in select_checks() for column in check.columns if column in df.columns]
+
+def _arrow_schema(columns):
+    import pyarrow as pa
+
+    fields = [pa.field('row_id', pa.int64())]
+    for column in columns:
+        if column in LABEL_COLUMNS or column.endswith('_decided_by'):
+            fields.append(pa.field(column, pa.dictionary(pa.int32(), pa.string())))
+        elif column.endswith('_cluster'):
+            fields.append(pa.field(column, pa.int64()))
+        else:
+            fields.append(pa.field(column, pa.bool_()))
+    return pa.schema(fields)
+
+class RowResultWriter:
+    """Appends row-level check results to a compressed columnar file, one frame or chunk at a time.
+
+    The format follows the extension: .parquet (zstd), .arrow or .feather
+    (Arrow IPC, zstd), or .jsonl / .jsonl.gz. Only the check columns are
+    written, plus row_id, the row's position in the input; the message, name
+    and contact text are left out. Downstream jobs can read just the columns
+    they need, e.g. pd.read_parquet(path, columns=['row_id', 'email_flag']).
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._columns = None
+        self._schema = None
+        self._writer = None
+        self._file = None
+
+    def write(self, df):
+        df = unpack_flags(df)
+        if self._columns is None:
+            self._columns = result_columns(df)
+        frame = df[self._columns].copy()
+        frame.insert(0, 'row_id', df.index.to_numpy())
+
+        if self.path.endswith(('.jsonl', '.jsonl.gz', '.json', '.json.gz')):
+            if self._file is None:
+                self._file = gzip.open(self.path, 'wt') if self.path.endswith('.gz') else open(self.path, 'w')
+            for line in frame.to_json(orient='records', lines=True).splitlines():
+                self._file.write(line + '\n')
+            return
+
+        import pyarrow as pa
+        if self._writer is None:
+            self._schema = _arrow_schema(self._columns)
+            if self.path.endswith('.parquet'):
+                import pyarrow.parquet as pq
+                self._writer = pq.ParquetWriter(self.path, self._schema, compression='zstd')
+            elif self.path.endswith(('.arrow', '.feather')):
+                self._writer = pa.ipc.new_file(self.path, self._schema,
+                                               options=pa.ipc.IpcWriteOptions(compression='zstd'))
+            else:
+                raise ValueError(f"Unsupported results format: {self.path} (use .parquet, .arrow, .feather or .jsonl)")
+        self._writer.write_table(pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False))
+
+    def close(self):
+        for handle in (self._writer, self._file):
+            if handle is not None:
+                handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def write_row_results(df, output_path):
+    """Writes the row-level check results of an evaluated frame (see RowResultWriter)."""
+    with RowResultWriter(output_path) as writer:
+        writer.write(df)
+    print(f"Row-level results saved to {output_path}")
+
+def write_report(summary, output_path="../data/report.txt", metrics=None):
+    """Writes the text report; metrics, a RunMetrics.to_dict() snapshot, adds a performance section."""
     with open(output_path, "w") as file:
         file.write("Dataset Quality and Compliance Report\n")
         file.write("=" * 40 + "\n\n")
@@ -8,89 +239,164 @@ def generate_report(df, output_path="../data/report.txt"):
         # Data Quality Summary
         file.write("1. Data Quality Summary\n")
         file.write("-" * 40 + "\n")
-        
+
         # Relevance check
-        if 'relevance_flag' in df.columns:
-            relevance_count = df['relevance_flag'].value_counts().to_dict()
-            file.write(f"Relevant Entries: {relevance_count.get(True, 0)}\n")
-            file.write(f"Irrelevant Entries: {relevance_count.get(False, 0)}\n")
+        estimates = summary.get('estimates') or {}
+        if summary['relevant'] is not None:
+            file.write(f"Relevant Entries: {summary['relevant']}\n")
+            file.write(f"Irrelevant Entries: {summary['irrelevant']}\n")
+        elif 'relevance_rate' in estimates:
+            file.write(f"Estimated Relevance Rate: {format_estimate(estimates['relevance_rate'])}\n")
         else:
             file.write("Relevance Check Not Performed\n")
-        
+
         # Duplicates
-        if 'duplicate_flag' in df.columns:
-            duplicates_count = df['duplicate_flag'].sum()
-            file.write(f"Duplicate Entries: {duplicates_count}\n")
+        if summary['duplicate_flag'] is not None:
+            file.write(f"Duplicate Entries: {summary['duplicate_flag']}\n")
         else:
             file.write("Duplicate Check Not Performed\n")
 
+        if summary.get('near_duplicate_flag') is not None:
+            file.write(f"Near-Duplicate Entries: {summary['near_duplicate_flag']}\n")
+
         # Completeness
-        if 'missing_message' in df.columns:
-            missing_message_count = df['missing_message'].sum()
-            file.write(f"Entries with Missing Messages: {missing_message_count}\n")
+        if summary['missing_message'] is not None:
+            file.write(f"Entries with Missing Messages: {summary['missing_message']}\n")
         else:
             file.write("Missing Message Check Not Performed\n")
-        
-        if 'missing_name' in df.columns:
-            missing_name_count = df['missing_name'].sum()
-            file.write(f"Entries with Missing Names: {missing_name_count}\n")
+
+        if summary['missing_name'] is not None:
+            file.write(f"Entries with Missing Names: {summary['missing_name']}\n")
         else:
             file.write("Missing Name Check Not Performed\n")
 
         # Language Quality
-        if 'language_quality_flag' in df.columns:
-            language_quality_count = df['language_quality_flag'].sum()
-            file.write(f"Entries with Poor Language Quality: {language_quality_count}\n\n")
+        if summary['language_quality_flag'] is not None:
+            file.write(f"Entries with Poor Language Quality: {summary['language_quality_flag']}\n\n")
         else:
             file.write("Language Quality Check Not Performed\n\n")
 
         # Compliance Summary
         file.write("2. Compliance Summary\n")
         file.write("-" * 40 + "\n")
-        if 'email_flag' in df.columns:
-            pii_email_count = df['email_flag'].sum()
-            file.write(f"Entries with Detected Email PII: {pii_email_count}\n")
+        if summary['email_flag'] is not None:
+            file.write(f"Entries with Detected Email PII: {summary['email_flag']}\n")
         else:
             file.write("Email PII Detection Not Performed\n")
 
-        if 'ssn_flag' in df.columns:
-            pii_ssn_count = df['ssn_flag'].sum()
-            file.write(f"Entries with Detected SSN PII: {pii_ssn_count}\n")
+        if summary['ssn_flag'] is not None:
+            file.write(f"Entries with Detected SSN PII: {summary['ssn_flag']}\n")
         else:
             file.write("SSN PII Detection Not Performed\n")
 
-        if 'phone_flag' in df.columns:
-            pii_phone_count = df['phone_flag'].sum()
-            file.write(f"Entries with Detected Phone PII: {pii_phone_count}\n")
+        if summary['phone_flag'] is not None:
+            file.write(f"Entries with Detected Phone PII: {summary['phone_flag']}\n")
         else:
             file.write("Phone PII Detection Not Performed\n")
 
-        pii_total_count = (
-            df['email_flag'].sum() if 'email_flag' in df.columns else 0
-        ) + (
-            df['ssn_flag'].sum() if 'ssn_flag' in df.columns else 0
-        ) + (
-            df['phone_flag'].sum() if 'phone_flag' in df.columns else 0
-        )
-        file.write(f"Total Entries with PII: {pii_total_count}\n\n")
+        for kind in EXTRA_PII_TYPES:
+            if summary[f"{kind}_flag"] is not None:
+                file.write(f"Entries with Detected {PII_LABELS.get(kind, kind)} PII: {summary[f'{kind}_flag']}\n")
+
+        derived = derive_metrics(summary)
+        file.write(f"Total Entries with PII: {derived['pii_total']}\n")
+        if summary.get('any_pii') is not None:
+            file.write(f"Distinct Entries with Any PII: {summary['any_pii']}\n")
+        if summary.get('lexicon_counts') is not None:
+            matches = ", ".join(f"{category} {count}" for category, count in sorted(summary['lexicon_counts'].items()))
+            file.write(f"Entries Matching Lexicon Terms: {matches or 'None'}\n")
+        file.write("\n")
+
+        # Bias Summary
+        file.write("3. Bias Summary\n")
+        file.write("-" * 40 + "\n")
+        if summary['language_bias_flag'] is not None:
+            file.write(f"Entries with Biased Language: {summary['language_bias_flag']} "
+                       f"({derived['language_bias_rate']:.1%})\n")
+        elif 'language_bias_rate' in estimates:
+            file.write(f"Estimated Biased-Language Rate: {format_estimate(estimates['language_bias_rate'])}\n")
+        else:
+            file.write("Language Bias Detection Not Performed\n")
+
+        gender_estimates = {name[len('gender_'):-len('_share')]: entry for name, entry in estimates.items()
+                            if name.startswith('gender_')}
+        if summary['gender_counts'] is None and gender_estimates:
+            file.write("Estimated Gender Representation:\n")
+            for gender, entry in sorted(gender_estimates.items()):
+                file.write(f"  {gender.capitalize()}: {format_estimate(entry)}\n")
+            if derived['gender_parity'] is not None:
+                file.write(f"Estimated Gender Parity (smaller / larger of male and female): "
+                           f"{derived['gender_parity']:.2f}\n\n")
+            else:
+                file.write("Gender Parity: No male or female names\n\n")
+        elif derived['gender_shares'] is not None:
+            shares = ", ".join(
+                f"{gender.capitalize()} {summary['gender_counts'][gender]} ({share:.1%})"
+                for gender, share in sorted(derived['gender_shares'].items())
+            )
+            file.write(f"Gender Representation: {shares or 'No names'}\n")
+            if derived['gender_parity'] is not None:
+                file.write(f"Gender Parity (smaller / larger of male and female): {derived['gender_parity']:.2f}\n\n")
+            else:
+                file.write("Gender Parity: No male or female names\n\n")
+        else:
+            file.write("Gender Representation Check Not Performed\n\n")
 
         # Summary Statistics
         file.write("4. Summary Statistics\n")
         file.write("-" * 40 + "\n")
-        total_entries = len(df)
-        quality_issues = sum([
-            df['relevance_flag'].value_counts().get(False, 0) if 'relevance_flag' in df.columns else 0,
-            df['duplicate_flag'].sum() if 'duplicate_flag' in df.columns else 0,
-            df['missing_message'].sum() if 'missing_message' in df.columns else 0,
-            df['missing_name'].sum() if 'missing_name' in df.columns else 0,
-            df['language_quality_flag'].sum() if 'language_quality_flag' in df.columns else 0,
-        ])
-        compliance_issues = pii_total_count
+        total_entries = summary['total_entries']
+        quality_issues = derived['quality_issues']
+        compliance_issues = derived['compliance_issues']
 
         file.write(f"Total Entries in Dataset: {total_entries}\n")
         file.write(f"Entries with Quality Issues: {quality_issues}\n")
         file.write(f"Entries with Compliance Issues: {compliance_issues}\n\n")
 
+        # Inference Cascade
+        if summary.get('decided_by_rule'):
+            file.write("5. Inference Cascade\n")
+            file.write("-" * 40 + "\n")
+            for check, rule_count in sorted(summary['decided_by_rule'].items()):
+                llm_count = summary['decided_by_llm'].get(check, 0)
+                undetermined = (summary.get('undetermined') or {}).get(check, 0)
+                file.write(f"{check}: {rule_count} rows decided by local rules, {llm_count} by the LLM"
+                           + (f", {undetermined} undetermined (API unavailable)" if undetermined else "") + "\n")
+            # Requests actually skipped, from the run metrics: rows share requests, and a combined request is
+            # only skipped when the rules decide every check of the message
+            saved = (metrics or {}).get('saved_requests') or {}
+            if saved:
+                file.write(f"LLM Requests Saved by Local Rules: {sum(saved.values())}\n")
+            file.write("\n")
+
+        # Performance
+        if metrics is not None:
+            file.write("6. Performance\n")
+            file.write("-" * 40 + "\n")
+            file.write(f"Total Time: {metrics['elapsed_seconds']:.2f} s ({metrics['rows_per_sec']} rows/s)\n")
+            for check, entry in metrics['checks'].items():
+                file.write(f"{check}: {entry['seconds']:.2f} s ({entry['rows_per_sec']} rows/s)\n")
+            requests = metrics['requests']
+            if requests['count']:
+                file.write(f"API Requests: {requests['count']} ({requests['errors']} failed), "
+                           f"latency p50 {requests['p50_ms']} ms, p99 {requests['p99_ms']} ms\n")
+                file.write(f"Rate-Limiter Wait (summed over requests): {requests['rate_limit_wait_seconds']:.2f} s\n")
+            tokens = metrics['tokens']
+            file.write(f"Tokens: {tokens['prompt']} prompt, {tokens['completion']} completion\n")
+            cache = metrics['cache']
+            if cache['hits'] or cache['misses']:
+                file.write(f"Cache: {cache['hits']} hits, {cache['misses']} misses\n")
+            for check, entry in metrics['retries'].items():
+                file.write(f"Retries in {check}: {entry['count']} ({entry['backoff_seconds']:.1f} s sleeping)\n")
+            for name, count in metrics['fallbacks'].items():
+                file.write(f"Fallbacks from {name}: {count}\n")
+            hedges = metrics.get('hedges') or {}
+            if hedges.get('sent'):
+                file.write(f"Hedged Requests: {hedges['sent']} ({hedges['won']} answered first)\n")
+            for name, count in (metrics.get('undetermined') or {}).items():
+                file.write(f"Undetermined {name} inputs: {count}\n")
+            file.write("\n")
+
         file.write("Note: This report provides a summary of detected quality, compliance, and bias issues in the dataset.\n")
 
     print(f"Report generated and saved to {output_path}")